@@ -0,0 +1,43 @@
+import os
+
+import httpx
+
+BOT_SERVICE_URL = os.getenv("BOT_SERVICE_URL", "http://bot:9000")
+BOT_API_KEY = os.getenv("BOT_API_KEY", "")
+BOT_HTTP_MAX_CONNECTIONS = int(os.getenv("BOT_HTTP_MAX_CONNECTIONS", "20"))
+BOT_HTTP_MAX_KEEPALIVE = int(os.getenv("BOT_HTTP_MAX_KEEPALIVE", "10"))
+BOT_HTTP_KEEPALIVE_SECONDS = float(os.getenv("BOT_HTTP_KEEPALIVE_SECONDS", "30"))
+BOT_HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("BOT_HTTP_CONNECT_TIMEOUT_SECONDS", "2"))
+BOT_HTTP_TIMEOUT_SECONDS = float(os.getenv("BOT_HTTP_TIMEOUT_SECONDS", "5"))
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_bot_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=BOT_SERVICE_URL,
+            headers={"X-Bot-Token": BOT_API_KEY} if BOT_API_KEY else None,
+            limits=httpx.Limits(
+                max_connections=BOT_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=BOT_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=BOT_HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                BOT_HTTP_TIMEOUT_SECONDS, connect=BOT_HTTP_CONNECT_TIMEOUT_SECONDS
+            ),
+        )
+    return _client
+
+
+async def close_bot_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def post_to_bot(path: str, payload: dict, timeout: float | None = None) -> httpx.Response:
+    kwargs = {"timeout": timeout} if timeout is not None else {}
+    return await get_bot_client().post(path, json=payload, **kwargs)
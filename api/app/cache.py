@@ -0,0 +1,85 @@
+"""Read-through cache for dashboard aggregates.
+
+Each scope has a row in ``cache_versions`` that is bumped inside the same
+transaction as any write to the models it covers, so a cached value is reused
+only while the version it was computed at is still current. The version
+lives in the database, so a write in one worker invalidates every worker.
+"""
+from typing import Any, Awaitable, Callable, Hashable
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .models import CacheVersion, FoodPlace, FoodVisit
+
+# scope -> models whose writes invalidate it
+CACHE_SCOPES = {
+    "food": (FoodPlace, FoodVisit),
+}
+
+
+class StatsCache:
+    def __init__(self) -> None:
+        self.entries: dict[tuple[str, Hashable], tuple[int, Any]] = {}
+        self.metrics = {"hits": 0, "misses": 0}
+
+    async def get_or_compute(
+        self,
+        db: AsyncSession,
+        scope: str,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        version = (
+            await db.scalar(select(CacheVersion.version).where(CacheVersion.key == scope))
+            or 0
+        )
+        entry = self.entries.get((scope, key))
+        if entry is not None and entry[0] == version:
+            self.metrics["hits"] += 1
+            return entry[1]
+        self.metrics["misses"] += 1
+        value = await compute()
+        # Keep only the newest key per scope (e.g. the current year).
+        self.entries = {k: v for k, v in self.entries.items() if k[0] != scope}
+        self.entries[(scope, key)] = (version, value)
+        return value
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "entries": len(self.entries)}
+
+
+stats_cache = StatsCache()
+
+
+def touched_scopes(session: Session) -> set[str]:
+    objects = [*session.new, *session.dirty, *session.deleted]
+    return {
+        scope
+        for scope, models in CACHE_SCOPES.items()
+        if any(isinstance(obj, models) for obj in objects)
+    }
+
+
+@event.listens_for(Session, "before_flush")
+def collect_touched_scopes(session: Session, _flush_context, _instances) -> None:
+    scopes = touched_scopes(session)
+    if scopes:
+        session.info.setdefault("touched_scopes", set()).update(scopes)
+
+
+@event.listens_for(Session, "after_flush")
+def bump_cache_versions(session: Session, _flush_context) -> None:
+    scopes = session.info.pop("touched_scopes", None)
+    if not scopes:
+        return
+    conn = session.connection()
+    for scope in sorted(scopes):
+        bumped = conn.execute(
+            update(CacheVersion)
+            .where(CacheVersion.key == scope)
+            .values(version=CacheVersion.version + 1)
+        )
+        if bumped.rowcount == 0:
+            conn.execute(insert(CacheVersion).values(key=scope, version=1))
@@ -0,0 +1,162 @@
+"""Per-user check-in rollups kept in ``check_in_month_counts`` and
+``check_in_location_counts``.
+
+Check-in endpoints call ``refresh_check_in_rollups`` with the check-in as it
+was before and after the write; only the month and location buckets those
+touch are recounted, in the same transaction.
+
+    python -m app.check_in_rollups    rebuild both tables from check_ins
+"""
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import Integer, cast, delete, extract, func, insert, literal, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import CheckIn, CheckInLocationCount, CheckInMonthCount, User
+
+# CheckInLocationCount.year for the all-time rows.
+ALL_TIME = 0
+
+
+def check_in_label():
+    return func.coalesce(CheckIn.location_label, CheckIn.location_name)
+
+
+def check_in_point(check_in: CheckIn) -> tuple[datetime, str | None]:
+    label = check_in.location_label
+    return check_in.visited_at, label if label is not None else check_in.location_name
+
+
+def year_bounds(year: int) -> tuple[datetime, datetime]:
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def month_bounds(year: int, month: int) -> tuple[datetime, datetime]:
+    end = datetime(year + (1 if month == 12 else 0), month % 12 + 1, 1)
+    return datetime(year, month, 1), end
+
+
+async def store_rollup(db: AsyncSession, model, key: tuple, **values) -> None:
+    row = await db.get(model, key)
+    if not values["count"]:
+        if row is not None:
+            await db.delete(row)
+        return
+    if row is None:
+        columns = [column.key for column in model.__table__.primary_key.columns]
+        row = model(**dict(zip(columns, key)))
+        db.add(row)
+    for name, value in values.items():
+        setattr(row, name, value)
+
+
+async def refresh_check_in_rollups(
+    db: AsyncSession, user_id: int, points: Iterable[tuple[datetime, str | None]]
+) -> None:
+    await db.flush()
+    # Serialise rollup writers per user on the user's row, so the recounts below
+    # see any concurrent check-in that committed first and no one else inserts
+    # the rollup rows in between. NO KEY UPDATE doesn't conflict with the key
+    # share lock the check-in's own foreign key already holds.
+    await db.execute(
+        select(User.id).where(User.id == user_id).with_for_update(key_share=True)
+    )
+    points = list(points)
+    for year, month in {(at.year, at.month) for at, _ in points}:
+        start, end = month_bounds(year, month)
+        count = await db.scalar(
+            select(func.count(CheckIn.id)).where(
+                CheckIn.user_id == user_id,
+                CheckIn.visited_at >= start,
+                CheckIn.visited_at < end,
+            )
+        )
+        await store_rollup(db, CheckInMonthCount, (user_id, year, month), count=count)
+    buckets = {
+        (year, label)
+        for at, label in points
+        if label is not None
+        for year in (ALL_TIME, at.year)
+    }
+    for year, label in buckets:
+        conditions = [CheckIn.user_id == user_id, check_in_label() == label]
+        if year != ALL_TIME:
+            start, end = year_bounds(year)
+            conditions += [CheckIn.visited_at >= start, CheckIn.visited_at < end]
+        count, latitude, longitude = (
+            await db.execute(
+                select(
+                    func.count(CheckIn.id),
+                    func.max(CheckIn.latitude),
+                    func.max(CheckIn.longitude),
+                ).where(*conditions)
+            )
+        ).one()
+        await store_rollup(
+            db,
+            CheckInLocationCount,
+            (user_id, year, label),
+            count=count,
+            latitude=latitude,
+            longitude=longitude,
+        )
+
+
+def rebuild_check_in_rollups(conn: Connection) -> None:
+    year = cast(extract("year", CheckIn.visited_at), Integer)
+    month = cast(extract("month", CheckIn.visited_at), Integer)
+    label = check_in_label()
+    location_columns = ["user_id", "year", "label", "count", "latitude", "longitude"]
+    location_aggregates = [
+        func.count(CheckIn.id),
+        func.max(CheckIn.latitude),
+        func.max(CheckIn.longitude),
+    ]
+    conn.execute(delete(CheckInMonthCount))
+    conn.execute(delete(CheckInLocationCount))
+    conn.execute(
+        insert(CheckInMonthCount).from_select(
+            ["user_id", "year", "month", "count"],
+            select(CheckIn.user_id, year, month, func.count(CheckIn.id)).group_by(
+                CheckIn.user_id, year, month
+            ),
+        )
+    )
+    conn.execute(
+        insert(CheckInLocationCount).from_select(
+            location_columns,
+            select(CheckIn.user_id, year, label, *location_aggregates)
+            .where(label.isnot(None))
+            .group_by(CheckIn.user_id, year, label),
+        )
+    )
+    conn.execute(
+        insert(CheckInLocationCount).from_select(
+            location_columns,
+            select(
+                CheckIn.user_id,
+                literal(ALL_TIME, Integer),
+                label,
+                *location_aggregates,
+            )
+            .where(label.isnot(None))
+            .group_by(CheckIn.user_id, label),
+        )
+    )
+
+
+def main() -> None:
+    from .db import engine
+
+    with engine.begin() as conn:
+        for model in (CheckInMonthCount, CheckInLocationCount):
+            model.__table__.create(conn, checkfirst=True)
+        rebuild_check_in_rollups(conn)
+        total = conn.scalar(select(func.coalesce(func.sum(CheckInMonthCount.count), 0)))
+    print(f"rebuilt rollups for {total} check-ins")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,171 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:////data/nutplaces.db")
+# Optional replica for read-only requests; unset means everything uses DATABASE_URL.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+# How long a user's reads stay on the primary after they write (replication lag cover).
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+# default | queue | null | static
+DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "default")
+# Queue pool sizing, used for PostgreSQL (and SQLite with DB_POOL_CLASS=queue).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args, future=True)
+# Applied to every new SQLite connection; set a value to "" to leave SQLite's default.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def to_sync_url(url: str) -> str:
+    # psycopg 3 serves both engines, so one driver covers sync and async.
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+psycopg:" + url.split(":", 1)[1]
+    return url
+
+
+def to_async_url(url: str) -> str:
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return to_sync_url(url)
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict[str, str] = SQLITE_PRAGMAS) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if value:
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def pool_options(is_async: bool) -> dict:
+    queue_sizing = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if DB_POOL_CLASS == "queue":
+        return {"poolclass": AsyncAdaptedQueuePool if is_async else QueuePool, **queue_sizing}
+    if DB_POOL_CLASS == "null":
+        return {"poolclass": NullPool}
+    if DB_POOL_CLASS == "static":
+        return {"poolclass": StaticPool}
+    if not is_sqlite:
+        return queue_sizing
+    return {}
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+if is_sqlite:
+    connect_args = {"check_same_thread": False}
+else:
+    connect_args = {
+        "application_name": "nutplaces-api",
+        "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
+    }
+engine = create_engine(
+    to_sync_url(DATABASE_URL), connect_args=connect_args, future=True, **pool_options(False)
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Request handlers use the async engine so queries never block the event loop;
+# the sync engine above is kept for schema setup and one-off scripts.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, connect_args=connect_args, **pool_options(True)
+)
+read_async_engine = (
+    create_async_engine(
+        to_async_url(DATABASE_READ_URL),
+        connect_args=connect_args,
+        **pool_options(True),
+    )
+    if DATABASE_READ_URL
+    else None
+)
+
+# user id -> monotonic time of their last committed write. Per process, so with
+# several workers a read can still land on the replica; the window absorbs that
+# only when the same worker serves the follow-up request.
+recent_writers: dict[int, float] = {}
+
+
+def mark_recent_write(user_id: int) -> None:
+    now = time.monotonic()
+    recent_writers[user_id] = now
+    if len(recent_writers) > 1024:
+        for stale_id, written_at in list(recent_writers.items()):
+            if now - written_at > READ_YOUR_WRITES_SECONDS:
+                del recent_writers[stale_id]
+
+
+def wrote_recently(user_id: int) -> bool:
+    written_at = recent_writers.get(user_id)
+    return written_at is not None and time.monotonic() - written_at < READ_YOUR_WRITES_SECONDS
+
+
+class RoutingSession(Session):
+    """Sends reads to the replica unless the session is pinned to the primary.
+
+    ``info["use_primary"]`` pins the whole session (mutating requests, users
+    inside their read-your-writes window). Flushes, DML and SELECT ... FOR
+    UPDATE always go to the primary, and pin the session from then on so the
+    rest of the request sees its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_async_engine is None:
+            return async_engine.sync_engine
+        if (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self.info["use_primary"] = True
+            self.info["wrote"] = True
+            return async_engine.sync_engine
+        if self.info.get("use_primary"):
+            return async_engine.sync_engine
+        return read_async_engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def remember_writer(session: Session) -> None:
+    if session.info.pop("wrote", False) and session.info.get("user_id"):
+        mark_recent_write(session.info["user_id"])
+
+
+AsyncSessionLocal = async_sessionmaker(
+    sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+
+if is_sqlite:
+    for sync_engine in (engine, async_engine.sync_engine):
+        event.listen(
+            sync_engine,
+            "connect",
+            lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection),
+        )
+
 
-class Base(DeclarativeBase):
+class Base(AsyncAttrs, DeclarativeBase):
     pass
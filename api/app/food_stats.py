@@ -0,0 +1,103 @@
+"""Per-place visit aggregates kept in ``food_place_stats``.
+
+Visit endpoints call ``refresh_food_place_stats`` in the same transaction as
+the write, so readers can use the table instead of grouping ``food_visits``.
+
+    python -m app.food_stats    rebuild every row from food_visits
+"""
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import FoodPlace, FoodPlaceVisitStats, FoodVisit
+
+STATS_COLUMNS = [
+    "food_place_id",
+    "visit_count",
+    "rating_count",
+    "rating_sum",
+    "rating_sq_sum",
+    "last_visit_at",
+    "any_again_no",
+    "any_again_yes",
+]
+
+
+def visit_aggregates() -> list:
+    def any_again(value: str):
+        return func.coalesce(func.max(case((FoodVisit.again == value, 1), else_=0)), 0) == 1
+
+    return [
+        func.count(FoodVisit.id),
+        func.count(FoodVisit.rating),
+        func.coalesce(func.sum(FoodVisit.rating), 0),
+        func.coalesce(func.sum(FoodVisit.rating * FoodVisit.rating), 0),
+        func.max(FoodVisit.visited_at),
+        any_again("no"),
+        any_again("yes"),
+    ]
+
+
+def avg_rating_expr():
+    return case(
+        (FoodPlaceVisitStats.rating_count > 0, FoodPlaceVisitStats.rating_sum / FoodPlaceVisitStats.rating_count)
+    )
+
+
+def rating_variance_expr():
+    mean = FoodPlaceVisitStats.rating_sum / FoodPlaceVisitStats.rating_count
+    return FoodPlaceVisitStats.rating_sq_sum / FoodPlaceVisitStats.rating_count - mean * mean
+
+
+def stats_avg_rating(stats: FoodPlaceVisitStats | None) -> float | None:
+    if stats is None or not stats.rating_count:
+        return None
+    return stats.rating_sum / stats.rating_count
+
+
+async def refresh_food_place_stats(db: AsyncSession, place_id: int) -> FoodPlaceVisitStats:
+    await db.flush()
+    # Lock the row first so the aggregate below is read after any concurrent
+    # writer for the same place has committed.
+    stats = await db.scalar(
+        select(FoodPlaceVisitStats)
+        .where(FoodPlaceVisitStats.food_place_id == place_id)
+        .with_for_update()
+    )
+    if stats is None:
+        stats = FoodPlaceVisitStats(food_place_id=place_id)
+        db.add(stats)
+    row = (
+        await db.execute(
+            select(*visit_aggregates()).where(FoodVisit.food_place_id == place_id)
+        )
+    ).one()
+    for name, value in zip(STATS_COLUMNS[1:], row):
+        setattr(stats, name, value)
+    return stats
+
+
+def rebuild_food_place_stats(conn: Connection) -> None:
+    conn.execute(delete(FoodPlaceVisitStats))
+    conn.execute(
+        insert(FoodPlaceVisitStats).from_select(
+            STATS_COLUMNS,
+            select(FoodPlace.id, *visit_aggregates())
+            .outerjoin(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
+            .group_by(FoodPlace.id),
+        )
+    )
+
+
+def main() -> None:
+    from .db import engine
+
+    with engine.begin() as conn:
+        FoodPlaceVisitStats.__table__.create(conn, checkfirst=True)
+        rebuild_food_place_stats(conn)
+        total = conn.scalar(select(func.count()).select_from(FoodPlaceVisitStats))
+    print(f"rebuilt stats for {total} food places")
+
+
+if __name__ == "__main__":
+    main()
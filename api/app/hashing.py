@@ -0,0 +1,91 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+
+from . import auth
+
+PIN_HASH_WORKERS = int(os.getenv("PIN_HASH_WORKERS", str(os.cpu_count() or 1)))
+PIN_HASH_QUEUE_SIZE = int(os.getenv("PIN_HASH_QUEUE_SIZE", "32"))
+PIN_HASH_TIMEOUT_SECONDS = float(os.getenv("PIN_HASH_TIMEOUT_SECONDS", "5"))
+
+_executor: ProcessPoolExecutor | None = None
+# Jobs submitted and not yet finished, including ones whose caller timed out;
+# released from the executor's thread, hence the lock.
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _new_pool() -> ProcessPoolExecutor:
+    # spawn keeps workers from inheriting the event loop and DB connections.
+    return ProcessPoolExecutor(
+        max_workers=max(PIN_HASH_WORKERS, 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def start_hash_pool() -> None:
+    global _executor
+    if _executor is None:
+        _executor = _new_pool()
+
+
+def stop_hash_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _release(_: Future) -> None:
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+def _replace_broken_pool(broken: ProcessPoolExecutor) -> None:
+    global _executor
+    if _executor is broken:
+        broken.shutdown(wait=False, cancel_futures=True)
+        _executor = _new_pool()
+
+
+async def _run(fn, *args):
+    global _pending
+    executor = _executor
+    if executor is None:
+        return fn(*args)
+    with _pending_lock:
+        if _pending >= PIN_HASH_WORKERS + PIN_HASH_QUEUE_SIZE:
+            raise HTTPException(status_code=503, detail="Too many pin checks, try again")
+        _pending += 1
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        _release(None)
+        _replace_broken_pool(executor)
+        raise HTTPException(status_code=503, detail="Pin check unavailable, try again")
+    # The slot is held until the worker is really done: a timed-out job that
+    # already started keeps running, and still counts against the bound.
+    future.add_done_callback(_release)
+    try:
+        return await asyncio.wait_for(
+            asyncio.wrap_future(future), timeout=PIN_HASH_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Pin check timed out")
+    except BrokenProcessPool:
+        _replace_broken_pool(executor)
+        raise HTTPException(status_code=503, detail="Pin check unavailable, try again")
+
+
+async def hash_pin(pin: str) -> tuple[str, str]:
+    return await _run(auth.hash_pin, pin)
+
+
+async def verify_pin(pin: str, salt: str, expected_hash: str) -> bool:
+    return await _run(auth.verify_pin, pin, salt, expected_hash)
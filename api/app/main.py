@@ -3,21 +3,42 @@ import base64
 import binascii
 import html
 import json
-import threading
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
 import math
 import random
 from uuid import uuid4
 import requests
+import httpx
 import jwt
-from fastapi import FastAPI, Depends, HTTPException, Header
-from sqlalchemy import func, or_
+from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from sqlalchemy import and_, case, delete, exists, func, or_, select, update
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from .db import SessionLocal, engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from .cache import stats_cache
+from .check_in_rollups import (
+    ALL_TIME,
+    check_in_point,
+    month_bounds,
+    refresh_check_in_rollups,
+    year_bounds,
+)
+from .db import AsyncSessionLocal, async_engine, engine, read_async_engine, wrote_recently
+from .food_stats import (
+    avg_rating_expr,
+    rating_variance_expr,
+    refresh_food_place_stats,
+    stats_avg_rating,
+)
+from .migrations import upgrade
+from .pagination import SortKey, count_rows, fetch_page
 from .models import (
     Base,
+    CheckInLocationCount,
+    CheckInMonthCount,
+    FoodPlaceVisitStats,
     User,
     OtpToken,
     MagicLinkToken,
@@ -27,6 +48,7 @@ from .models import (
     FoodPlace,
     FoodVisit,
     FoodVisitComment,
+    FoodVisitDish,
     Activity,
     ActivityVisit,
     ActivityVisitComment,
@@ -87,6 +109,7 @@ from .schemas import (
     ActivityUpdate,
     ActivityOut,
     ActivityStats,
+    ActivityStatsGroup,
     ActivityListResponse,
     ActivityRollRequest,
     ActivityRollResponse,
@@ -121,9 +144,16 @@ from .auth import (
     generate_pin,
     generate_token,
     now_plus,
+)
+from .hashing import (
     hash_pin,
+    start_hash_pool,
+    stop_hash_pool,
     verify_pin as verify_pin_hash,
 )
+from .notifications import notifier
+from .token_sweeper import token_sweeper
+from .bot_client import BOT_SERVICE_URL, close_bot_client, get_bot_client, post_to_bot
 
 APP_ENV = os.getenv("APP_ENV", "dev")
 APP_ORIGIN = os.getenv("APP_ORIGIN", "http://localhost:5173")
@@ -139,7 +169,8 @@ WHITELIST = {
 }
 BOT_API_KEY = os.getenv("BOT_API_KEY", "")
 ADMIN_API_KEY = os.getenv("JWT_SECRET", "")
-BOT_SERVICE_URL = os.getenv("BOT_SERVICE_URL", "http://bot:9000")
+# Activity entries kept per user; older ones are trimmed on each new entry.
+USER_ACTIVITY_RETENTION = max(int(os.getenv("USER_ACTIVITY_RETENTION", "20")), 1)
 TRUST_DEVICE_DAYS = 30
 REFRESH_TOKEN_DAYS = 30
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/data/uploads")
@@ -149,8 +180,26 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(ASSET_DIR, exist_ok=True)
 
 Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="nut places API")
+upgrade(engine)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    start_hash_pool()
+    get_bot_client()
+    notifier.start()
+    token_sweeper.start()
+    yield
+    await token_sweeper.stop()
+    await notifier.stop()
+    await close_bot_client()
+    stop_hash_pool()
+    await async_engine.dispose()
+    if read_async_engine is not None:
+        await read_async_engine.dispose()
+
+
+app = FastAPI(title="nut places API", lifespan=lifespan)
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 app.mount("/assets", StaticFiles(directory=ASSET_DIR), name="assets")
 
@@ -163,12 +212,12 @@ app.add_middleware(
 )
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        # Only safe methods may read from the replica.
+        if request.method not in ("GET", "HEAD"):
+            db.info["use_primary"] = True
         yield db
-    finally:
-        db.close()
 
 
 def ensure_whitelisted(telegram_uid: str):
@@ -244,8 +293,8 @@ def build_google_maps_url(label: str | None, latitude: float | None, longitude:
     return f"https://www.google.com/maps/search/?api=1&query={requests.utils.quote(query)}"
 
 
-def log_user_activity(
-    db: Session,
+async def log_user_activity(
+    db: AsyncSession,
     user: User,
     action: str,
     entity_type: str,
@@ -267,17 +316,22 @@ def log_user_activity(
         summary=summary,
     )
     db.add(entry)
-    # Keep only the latest 20 activity entries per user.
-    db.flush()
-    old_entries = (
-        db.query(UserActivity)
-        .filter(UserActivity.user_id == user.id)
-        .order_by(UserActivity.created_at.desc(), UserActivity.id.desc())
-        .offset(20)
-        .all()
-    )
-    for old in old_entries:
-        db.delete(old)
+    await db.flush()
+    # Entries are only ever appended here, so id order is creation order and
+    # everything older than the Nth newest id can go in one statement.
+    oldest_kept = (
+        select(UserActivity.id)
+        .where(UserActivity.user_id == user.id)
+        .order_by(UserActivity.id.desc())
+        .offset(USER_ACTIVITY_RETENTION - 1)
+        .limit(1)
+        .scalar_subquery()
+    )
+    await db.execute(
+        delete(UserActivity)
+        .where(UserActivity.user_id == user.id, UserActivity.id < oldest_kept)
+        .execution_options(synchronize_session=False)
+    )
     if action in {"delete", "update"} or entity_type in {"check_in", "journal_entry"}:
         notify_bot = False
     if notify_bot:
@@ -332,25 +386,17 @@ def notify_bot_activity(
         text = f"{display_name} {summary}"
         if detail_lines:
             text = f"{text}\n{detail_lines}"
-    headers = {"X-Bot-Token": BOT_API_KEY} if BOT_API_KEY else {}
-
-    def send_async() -> None:
-        try:
-            requests.post(
-                f"{BOT_SERVICE_URL}/send-activity",
-                json={
-                    "text": text,
-                    "image_url": bot_image_url or image_url,
-                    "parse_mode": parse_mode,
-                    "reply_markup": reply_markup,
-                },
-                headers=headers,
-                timeout=5,
-            )
-        except requests.RequestException:
-            pass
-
-    threading.Thread(target=send_async, daemon=True).start()
+    # Failed batches are resent (and spilled, then restored) with the same key,
+    # so the bot's outbox drops any copy it already accepted.
+    notifier.enqueue(
+        {
+            "text": text,
+            "image_url": bot_image_url or image_url,
+            "parse_mode": parse_mode,
+            "reply_markup": reply_markup,
+            "idempotency_key": uuid4().hex,
+        }
+    )
 
 
 def build_telegram_mention(user: User) -> str:
@@ -372,28 +418,28 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return earth_radius_km * c
 
 
-def ensure_pin_valid(user: User, pin: str):
+async def ensure_pin_valid(user: User, pin: str):
     if not user.pin_hash or not user.pin_salt:
         raise HTTPException(status_code=400, detail="Pin not set")
-    if not verify_pin_hash(pin, user.pin_salt, user.pin_hash):
+    if not await verify_pin_hash(pin, user.pin_salt, user.pin_hash):
         raise HTTPException(status_code=401, detail="Invalid pin")
 
 
-def get_or_create_user(db: Session, telegram_uid: str) -> User:
-    user = db.query(User).filter(User.telegram_uid == telegram_uid).first()
+async def get_or_create_user(db: AsyncSession, telegram_uid: str) -> User:
+    user = await db.scalar(select(User).where(User.telegram_uid == telegram_uid))
     if user:
         return user
     display_name = f"User {telegram_uid[-4:]}" if telegram_uid else "User"
     user = User(telegram_uid=telegram_uid, display_name=display_name)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    # Flushed, not committed: the caller commits with the rest of its request.
+    await db.flush()
     return user
 
 
-def get_current_user(
+async def get_current_user(
     authorization: str | None = Header(default=None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> User:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Unauthorized")
@@ -405,26 +451,29 @@ def get_current_user(
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    db.info["user_id"] = int(user_id)
+    if wrote_recently(int(user_id)):
+        db.info["use_primary"] = True
+    user = await db.get(User, int(user_id))
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     return user
 
 
-def trust_device(
-    db: Session,
+async def trust_device(
+    db: AsyncSession,
     user: User,
     device_id: str,
     device_name: str | None,
     user_agent: str | None,
 ) -> None:
-    device = (
-        db.query(TrustedDevice)
-        .filter(
+    device = await db.scalar(
+        select(TrustedDevice)
+        .where(
             TrustedDevice.user_id == user.id,
             TrustedDevice.device_id == device_id,
         )
-        .first()
+        .limit(1)
     )
     trusted_until = datetime.utcnow() + timedelta(days=TRUST_DEVICE_DAYS)
     if device:
@@ -434,7 +483,6 @@ def trust_device(
         device.revoked_at = None
         device.last_seen_at = datetime.utcnow()
         db.add(device)
-        db.commit()
         return
     device = TrustedDevice(
         user_id=user.id,
@@ -446,7 +494,6 @@ def trust_device(
         last_seen_at=datetime.utcnow(),
     )
     db.add(device)
-    db.commit()
 
 
 def parse_iso_datetime(value: str | None) -> datetime:
@@ -570,33 +617,21 @@ def normalize_food_visit_dishes(dishes) -> list[dict]:
     return normalized
 
 
-def decode_food_visit_dishes(value: str | None) -> list[dict]:
-    if not value:
-        return []
-    try:
-        raw = json.loads(value)
-    except (TypeError, json.JSONDecodeError):
-        return []
-    if not isinstance(raw, list):
-        return []
-    normalized = []
-    for item in raw:
-        if not isinstance(item, dict):
-            continue
-        name = str(item.get("name", "")).strip()
-        if not name:
-            continue
-        rating = item.get("rating")
-        try:
-            rating = float(rating) if rating is not None else None
-        except (TypeError, ValueError):
-            rating = None
-        normalized.append({"name": name, "rating": rating})
-    return normalized
+def build_dish_rows(dishes: list[dict], visit_id: int | None = None) -> list[FoodVisitDish]:
+    return [
+        FoodVisitDish(
+            visit_id=visit_id, position=position, name=dish["name"], rating=dish["rating"]
+        )
+        for position, dish in enumerate(dishes)
+    ]
 
 
-def serialize_activity(activity: Activity) -> ActivityOut:
-    updated_by = activity.updated_by_user
+def serialize_dishes(rows: list[FoodVisitDish]) -> list[dict]:
+    return [{"name": row.name, "rating": row.rating} for row in rows]
+
+
+async def serialize_activity(activity: Activity) -> ActivityOut:
+    updated_by = await activity.awaitable_attrs.updated_by_user
     return ActivityOut(
         id=activity.id,
         activity_type=activity.activity_type,
@@ -618,24 +653,24 @@ def serialize_activity(activity: Activity) -> ActivityOut:
     )
 
 
-def build_user_lookup(db: Session, user_ids: set[int]) -> dict[int, User]:
+async def build_user_lookup(db: AsyncSession, user_ids: set[int]) -> dict[int, User]:
     if not user_ids:
         return {}
-    users = db.query(User).filter(User.id.in_(user_ids)).all()
+    users = (await db.scalars(select(User).where(User.id.in_(user_ids)))).all()
     return {user.id: user for user in users}
 
 
-def update_activity_done_at(db: Session, activity_id: int) -> None:
-    last_visit = (
-        db.query(func.max(ActivityVisit.visited_at))
-        .filter(ActivityVisit.activity_id == activity_id)
-        .scalar()
+async def update_activity_done_at(db: AsyncSession, activity_id: int) -> None:
+    last_visit = await db.scalar(
+        select(func.max(ActivityVisit.visited_at)).where(
+            ActivityVisit.activity_id == activity_id
+        )
     )
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         return
     activity.done_at = last_visit
-    db.commit()
+    await db.commit()
 
 
 def is_singapore_label(label: str | None) -> bool:
@@ -728,7 +763,9 @@ def build_trips(check_ins: list[CheckIn]) -> list[TripOut]:
     return output
 
 
-def issue_refresh_token(db: Session, user: User, device_id: str | None = None) -> str:
+def issue_refresh_token(
+    db: AsyncSession, user: User, device_id: str | None = None
+) -> str:
     token = generate_token()
     refresh = RefreshToken(
         user_id=user.id,
@@ -738,46 +775,46 @@ def issue_refresh_token(db: Session, user: User, device_id: str | None = None) -
         revoked_at=None,
     )
     db.add(refresh)
-    db.commit()
     return token
 
 
-def rotate_refresh_token(
-    db: Session, token: str, device_id: str | None = None
+async def rotate_refresh_token(
+    db: AsyncSession, token: str, device_id: str | None = None
 ) -> tuple[User, str]:
-    refresh = (
-        db.query(RefreshToken)
-        .filter(
-            RefreshToken.token == token,
-            RefreshToken.revoked_at.is_(None),
-            RefreshToken.expires_at >= datetime.utcnow(),
+    """Revoke ``token`` and issue its replacement; the caller commits both together."""
+    # Device-bound tokens only rotate from that device while it is still trusted.
+    device_trusted = exists().where(
+        TrustedDevice.user_id == RefreshToken.user_id,
+        TrustedDevice.device_id == RefreshToken.device_id,
+        TrustedDevice.revoked_at.is_(None),
+        TrustedDevice.trusted_until >= now_plus(0),
+    )
+    device_condition = RefreshToken.device_id.is_(None)
+    if device_id:
+        device_condition = or_(
+            device_condition,
+            and_(RefreshToken.device_id == device_id, device_trusted),
         )
-        .first()
-    )
-    if not refresh:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if refresh.device_id:
-        if not device_id or refresh.device_id != device_id:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-        device = (
-            db.query(TrustedDevice)
-            .filter(
-                TrustedDevice.user_id == refresh.user_id,
-                TrustedDevice.device_id == refresh.device_id,
-                TrustedDevice.revoked_at.is_(None),
-                TrustedDevice.trusted_until >= now_plus(0),
+    revoked = (
+        await db.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token == token,
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at >= datetime.utcnow(),
+                device_condition,
             )
-            .first()
+            .values(revoked_at=datetime.utcnow())
+            .returning(RefreshToken.user_id, RefreshToken.device_id)
+            .execution_options(synchronize_session=False)
         )
-        if not device:
-            raise HTTPException(status_code=401, detail="Unauthorized")
-    refresh.revoked_at = datetime.utcnow()
-    db.add(refresh)
-    db.commit()
-    user = db.query(User).filter(User.id == refresh.user_id).first()
+    ).first()
+    if not revoked:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    user = await db.get(User, revoked.user_id)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    new_token = issue_refresh_token(db, user, device_id or refresh.device_id)
+    new_token = issue_refresh_token(db, user, device_id or revoked.device_id)
     return user, new_token
 
 
@@ -787,13 +824,13 @@ async def health():
 
 
 @app.post("/auth/request-otp", response_model=OtpResponse)
-async def request_otp(payload: OtpRequest, db: Session = Depends(get_db)):
+async def request_otp(payload: OtpRequest, db: AsyncSession = Depends(get_db)):
     ensure_whitelisted(payload.telegram_uid)
-    recent_token = (
-        db.query(OtpToken)
-        .filter(OtpToken.telegram_uid == payload.telegram_uid)
+    recent_token = await db.scalar(
+        select(OtpToken)
+        .where(OtpToken.telegram_uid == payload.telegram_uid)
         .order_by(OtpToken.created_at.desc())
-        .first()
+        .limit(1)
     )
     if recent_token:
         seconds_since = (datetime.utcnow() - recent_token.created_at).total_seconds()
@@ -812,14 +849,12 @@ async def request_otp(payload: OtpRequest, db: Session = Depends(get_db)):
         used=False,
     )
     db.add(token)
-    db.commit()
+    await db.commit()
     try:
-        response = requests.post(
-            f"{BOT_SERVICE_URL}/send-otp",
-            json={"telegram_uid": payload.telegram_uid, "pin": pin},
-            timeout=5,
+        await post_to_bot(
+            "/send-otp", {"telegram_uid": payload.telegram_uid, "pin": pin}
         )
-    except requests.RequestException:
+    except httpx.HTTPError:
         pass
     response = {"status": "sent"}
     if APP_ENV == "dev":
@@ -828,27 +863,27 @@ async def request_otp(payload: OtpRequest, db: Session = Depends(get_db)):
 
 
 @app.post("/auth/verify-pin", response_model=PinVerifyResponse)
-async def verify_pin(payload: PinVerify, db: Session = Depends(get_db)):
+async def verify_pin(payload: PinVerify, db: AsyncSession = Depends(get_db)):
     ensure_whitelisted(payload.telegram_uid)
-    user = get_or_create_user(db, payload.telegram_uid)
-    ensure_pin_valid(user, payload.pin)
+    user = await get_or_create_user(db, payload.telegram_uid)
+    await ensure_pin_valid(user, payload.pin)
     if payload.device_id:
-        device = (
-            db.query(TrustedDevice)
-            .filter(
+        device = await db.scalar(
+            select(TrustedDevice)
+            .where(
                 TrustedDevice.user_id == user.id,
                 TrustedDevice.device_id == payload.device_id,
                 TrustedDevice.revoked_at.is_(None),
                 TrustedDevice.trusted_until >= now_plus(0),
             )
-            .first()
+            .limit(1)
         )
         if device:
             device.last_seen_at = datetime.utcnow()
             db.add(device)
-            db.commit()
             access_token = create_access_token(str(user.id))
             refresh_token = issue_refresh_token(db, user, payload.device_id)
+            await db.commit()
             return PinVerifyResponse(
                 status="trusted",
                 access_token=access_token,
@@ -856,19 +891,22 @@ async def verify_pin(payload: PinVerify, db: Session = Depends(get_db)):
             )
     if SKIP_OTP:
         if payload.device_id:
-            trust_device(db, user, payload.device_id, payload.device_name, payload.user_agent)
+            await trust_device(
+                db, user, payload.device_id, payload.device_name, payload.user_agent
+            )
         access_token = create_access_token(str(user.id))
         refresh_token = issue_refresh_token(db, user, payload.device_id)
+        await db.commit()
         return PinVerifyResponse(
             status="trusted",
             access_token=access_token,
             refresh_token=refresh_token,
         )
-    recent_token = (
-        db.query(OtpToken)
-        .filter(OtpToken.telegram_uid == payload.telegram_uid)
+    recent_token = await db.scalar(
+        select(OtpToken)
+        .where(OtpToken.telegram_uid == payload.telegram_uid)
         .order_by(OtpToken.created_at.desc())
-        .first()
+        .limit(1)
     )
     if recent_token:
         seconds_since = (datetime.utcnow() - recent_token.created_at).total_seconds()
@@ -887,15 +925,13 @@ async def verify_pin(payload: PinVerify, db: Session = Depends(get_db)):
         used=False,
     )
     db.add(token)
-    db.commit()
+    await db.commit()
     try:
-        response = requests.post(
-            f"{BOT_SERVICE_URL}/send-otp",
-            json={"telegram_uid": payload.telegram_uid, "pin": pin},
-            timeout=5,
+        response = await post_to_bot(
+            "/send-otp", {"telegram_uid": payload.telegram_uid, "pin": pin}
         )
         response.raise_for_status()
-    except requests.RequestException:
+    except httpx.HTTPError:
         return PinVerifyResponse(status="otp_pending")
     return PinVerifyResponse(status="otp_sent")
 
@@ -903,31 +939,42 @@ async def verify_pin(payload: PinVerify, db: Session = Depends(get_db)):
 @app.post("/admin/set-pin", response_model=PinSetResponse)
 async def set_pin(
     payload: PinSet,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_admin_token: str | None = Header(default=None),
 ):
     if not ADMIN_API_KEY or x_admin_token != ADMIN_API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized")
     ensure_whitelisted(payload.telegram_uid)
-    user = get_or_create_user(db, payload.telegram_uid)
-    pin_hash, pin_salt = hash_pin(payload.pin)
+    user = await get_or_create_user(db, payload.telegram_uid)
+    pin_hash, pin_salt = await hash_pin(payload.pin)
     user.pin_hash = pin_hash
     user.pin_salt = pin_salt
     db.add(user)
-    db.commit()
+    await db.commit()
     return PinSetResponse(status="set")
 
 
+@app.get("/admin/metrics")
+async def get_admin_metrics(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_API_KEY or x_admin_token != ADMIN_API_KEY:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return {
+        "notifications": notifier.snapshot(),
+        "stats_cache": stats_cache.snapshot(),
+        "token_sweeper": token_sweeper.snapshot(),
+    }
+
+
 @app.post("/admin/set-profile", response_model=ProfileSetResponse)
 async def set_profile(
     payload: ProfileSet,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_admin_token: str | None = Header(default=None),
 ):
     if not ADMIN_API_KEY or x_admin_token != ADMIN_API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized")
     ensure_whitelisted(payload.telegram_uid)
-    user = get_or_create_user(db, payload.telegram_uid)
+    user = await get_or_create_user(db, payload.telegram_uid)
     if payload.display_name is not None:
         user.display_name = payload.display_name
     if payload.avatar_data is not None:
@@ -968,15 +1015,15 @@ async def set_profile(
     if payload.accent_color is not None:
         user.accent_color = payload.accent_color or None
     db.add(user)
-    db.commit()
+    await db.commit()
     return ProfileSetResponse(status="set")
 
 
 @app.get("/public/users", response_model=UserListResponse)
-async def list_users(db: Session = Depends(get_db)):
+async def list_users(db: AsyncSession = Depends(get_db)):
     users: list[UserPublic] = []
     for telegram_uid in sorted(WHITELIST):
-        user = get_or_create_user(db, telegram_uid)
+        user = await get_or_create_user(db, telegram_uid)
         users.append(
             UserPublic(
                 telegram_uid=user.telegram_uid,
@@ -987,40 +1034,44 @@ async def list_users(db: Session = Depends(get_db)):
                 birthday=user.birthday.isoformat() if user.birthday else None,
             )
         )
+    await db.commit()
     return UserListResponse(users=users)
 
 
 @app.post("/auth/verify-otp", response_model=AuthResponse)
-async def verify_otp(payload: OtpVerify, db: Session = Depends(get_db)):
+async def verify_otp(payload: OtpVerify, db: AsyncSession = Depends(get_db)):
     ensure_whitelisted(payload.telegram_uid)
-    token = (
-        db.query(OtpToken)
-        .filter(
+    # Consuming the pin is a single conditional UPDATE, so two requests racing
+    # with the same pin cannot both succeed.
+    consumed = await db.scalar(
+        update(OtpToken)
+        .where(
             OtpToken.telegram_uid == payload.telegram_uid,
             OtpToken.pin == payload.pin,
             OtpToken.used.is_(False),
             OtpToken.expires_at >= now_plus(0),
         )
-        .order_by(OtpToken.created_at.desc())
-        .first()
+        .values(used=True)
+        .returning(OtpToken.id)
+        .execution_options(synchronize_session=False)
     )
-    if not token:
+    if not consumed:
         raise HTTPException(status_code=401, detail="Invalid or expired pin")
-    token.used = True
-    db.add(token)
-    db.commit()
-    user = get_or_create_user(db, payload.telegram_uid)
+    user = await get_or_create_user(db, payload.telegram_uid)
     if payload.device_id:
-        trust_device(db, user, payload.device_id, payload.device_name, payload.user_agent)
+        await trust_device(
+            db, user, payload.device_id, payload.device_name, payload.user_agent
+        )
     access_token = create_access_token(str(user.id))
     refresh_token = issue_refresh_token(db, user, payload.device_id)
+    await db.commit()
     return AuthResponse(access_token=access_token, refresh_token=refresh_token)
 
 
 @app.post("/bot/create-magic-link", response_model=MagicLinkResponse)
 async def bot_create_magic_link(
     payload: MagicLinkRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_bot_token: str | None = Header(default=None),
 ):
     if BOT_API_KEY and x_bot_token != BOT_API_KEY:
@@ -1034,7 +1085,7 @@ async def bot_create_magic_link(
         used=False,
     )
     db.add(token)
-    db.commit()
+    await db.commit()
     app_origin = os.getenv("APP_ORIGIN", "http://localhost:5173")
     link = f"{app_origin}/?token={token_value}"
     return MagicLinkResponse(
@@ -1045,76 +1096,68 @@ async def bot_create_magic_link(
 
 
 @app.post("/auth/consume-magic-link", response_model=AuthResponse)
-async def consume_magic_link(payload: MagicLinkVerify, db: Session = Depends(get_db)):
-    token = (
-        db.query(MagicLinkToken)
-        .filter(
+async def consume_magic_link(payload: MagicLinkVerify, db: AsyncSession = Depends(get_db)):
+    telegram_uid = await db.scalar(
+        update(MagicLinkToken)
+        .where(
             MagicLinkToken.token == payload.token,
             MagicLinkToken.used.is_(False),
             MagicLinkToken.expires_at >= now_plus(0),
         )
-        .first()
+        .values(used=True)
+        .returning(MagicLinkToken.telegram_uid)
+        .execution_options(synchronize_session=False)
     )
-    if not token:
+    if not telegram_uid:
         raise HTTPException(status_code=401, detail="Invalid or expired link")
-    token.used = True
-    db.add(token)
-    db.commit()
-    user = get_or_create_user(db, token.telegram_uid)
+    user = await get_or_create_user(db, telegram_uid)
     access_token = create_access_token(str(user.id))
     refresh_token = issue_refresh_token(db, user)
+    await db.commit()
     try:
-        bot_url = os.getenv("BOT_INTERNAL_URL", "http://bot:9000")
-        bot_key = os.getenv("BOT_API_KEY", "")
-        headers = {"X-Bot-Token": bot_key} if bot_key else {}
-        requests.post(
-            f"{bot_url}/magic-link/expire",
-            json={"token": payload.token},
-            headers=headers,
-            timeout=3,
-        )
-    except Exception:
+        await post_to_bot("/magic-link/expire", {"token": payload.token}, timeout=3)
+    except httpx.HTTPError:
         pass
     return AuthResponse(access_token=access_token, refresh_token=refresh_token)
 
 
 @app.post("/auth/refresh", response_model=AuthResponse)
-async def refresh_token(payload: RefreshRequest, db: Session = Depends(get_db)):
-    user, new_refresh = rotate_refresh_token(
+async def refresh_token(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    user, new_refresh = await rotate_refresh_token(
         db, payload.refresh_token, payload.device_id
     )
+    await db.commit()
     access_token = create_access_token(str(user.id))
     return AuthResponse(access_token=access_token, refresh_token=new_refresh)
 
 
 @app.post("/auth/logout", response_model=ProfileSetResponse)
-async def logout(payload: RefreshRequest, db: Session = Depends(get_db)):
-    refresh = (
-        db.query(RefreshToken)
-        .filter(
+async def logout(payload: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    await db.execute(
+        update(RefreshToken)
+        .where(
             RefreshToken.token == payload.refresh_token,
             RefreshToken.revoked_at.is_(None),
         )
-        .first()
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
     )
-    if refresh:
-        refresh.revoked_at = datetime.utcnow()
-        db.add(refresh)
-        db.commit()
+    await db.commit()
     return ProfileSetResponse(status="logged_out")
 
 
 @app.get("/me", response_model=ProfileResponse)
 async def get_profile(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     devices = (
-        db.query(TrustedDevice)
-        .filter(TrustedDevice.user_id == user.id)
-        .order_by(TrustedDevice.last_seen_at.desc())
-        .all()
-    )
+        await db.scalars(
+            select(TrustedDevice)
+            .where(TrustedDevice.user_id == user.id)
+            .order_by(TrustedDevice.last_seen_at.desc())
+        )
+    ).all()
     return ProfileResponse(
         telegram_uid=user.telegram_uid,
         display_name=user.display_name,
@@ -1141,49 +1184,64 @@ async def get_profile(
 async def list_user_activity(
     limit: int = 6,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     limit = max(min(limit, 50), 1)
     entries = (
-        db.query(UserActivity)
-        .filter(UserActivity.user_id == user.id)
-        .order_by(UserActivity.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+        await db.scalars(
+            select(UserActivity)
+            .where(UserActivity.user_id == user.id)
+            .order_by(UserActivity.created_at.desc())
+            .limit(limit)
+        )
+    ).all()
     entity_map = {entry.entity_type: set() for entry in entries}
     for entry in entries:
         if entry.entity_id:
             entity_map[entry.entity_type].add(entry.entity_id)
     food_places = (
-        db.query(FoodPlace)
-        .filter(FoodPlace.id.in_(entity_map.get("food_place", set())))
-        .all()
+        (
+            await db.scalars(
+                select(FoodPlace).where(
+                    FoodPlace.id.in_(entity_map.get("food_place", set()))
+                )
+            )
+        ).all()
         if entity_map.get("food_place")
         else []
     )
     food_places_by_id = {place.id: place for place in food_places}
     food_visits = (
-        db.query(FoodVisit)
-        .filter(FoodVisit.id.in_(entity_map.get("food_visit", set())))
-        .all()
+        (
+            await db.scalars(
+                select(FoodVisit)
+                .where(FoodVisit.id.in_(entity_map.get("food_visit", set())))
+                .options(selectinload(FoodVisit.food_place))
+            )
+        ).all()
         if entity_map.get("food_visit")
         else []
     )
     food_visits_by_id = {visit.id: visit for visit in food_visits}
     food_visit_comments = (
-        db.query(FoodVisitComment)
-        .filter(FoodVisitComment.id.in_(entity_map.get("food_visit_comment", set())))
-        .all()
+        (
+            await db.scalars(
+                select(FoodVisitComment).where(
+                    FoodVisitComment.id.in_(entity_map.get("food_visit_comment", set()))
+                )
+            )
+        ).all()
         if entity_map.get("food_visit_comment")
         else []
     )
     food_visit_comments_by_id = {comment.id: comment for comment in food_visit_comments}
     food_comment_visit_ids = {comment.visit_id for comment in food_visit_comments}
     food_comment_visits = (
-        db.query(FoodVisit)
-        .filter(FoodVisit.id.in_(food_comment_visit_ids))
-        .all()
+        (
+            await db.scalars(
+                select(FoodVisit).where(FoodVisit.id.in_(food_comment_visit_ids))
+            )
+        ).all()
         if food_comment_visit_ids
         else []
     )
@@ -1192,9 +1250,11 @@ async def list_user_activity(
         visit.food_place_id for visit in food_comment_visits if visit.food_place_id
     }
     food_comment_places = (
-        db.query(FoodPlace)
-        .filter(FoodPlace.id.in_(food_comment_place_ids))
-        .all()
+        (
+            await db.scalars(
+                select(FoodPlace).where(FoodPlace.id.in_(food_comment_place_ids))
+            )
+        ).all()
         if food_comment_place_ids
         else []
     )
@@ -1202,29 +1262,39 @@ async def list_user_activity(
         place.id: place for place in food_comment_places
     }
     activities = (
-        db.query(Activity)
-        .filter(Activity.id.in_(entity_map.get("activity", set())))
-        .all()
+        (
+            await db.scalars(
+                select(Activity).where(
+                    Activity.id.in_(entity_map.get("activity", set()))
+                )
+            )
+        ).all()
         if entity_map.get("activity")
         else []
     )
     activities_by_id = {activity.id: activity for activity in activities}
     activity_visits = (
-        db.query(ActivityVisit)
-        .filter(ActivityVisit.id.in_(entity_map.get("activity_visit", set())))
-        .all()
+        (
+            await db.scalars(
+                select(ActivityVisit)
+                .where(ActivityVisit.id.in_(entity_map.get("activity_visit", set())))
+                .options(selectinload(ActivityVisit.activity))
+            )
+        ).all()
         if entity_map.get("activity_visit")
         else []
     )
     activity_visits_by_id = {visit.id: visit for visit in activity_visits}
     activity_visit_comments = (
-        db.query(ActivityVisitComment)
-        .filter(
-            ActivityVisitComment.id.in_(
-                entity_map.get("activity_visit_comment", set())
+        (
+            await db.scalars(
+                select(ActivityVisitComment).where(
+                    ActivityVisitComment.id.in_(
+                        entity_map.get("activity_visit_comment", set())
+                    )
+                )
             )
-        )
-        .all()
+        ).all()
         if entity_map.get("activity_visit_comment")
         else []
     )
@@ -1235,9 +1305,13 @@ async def list_user_activity(
         comment.visit_id for comment in activity_visit_comments
     }
     activity_comment_visits = (
-        db.query(ActivityVisit)
-        .filter(ActivityVisit.id.in_(activity_comment_visit_ids))
-        .all()
+        (
+            await db.scalars(
+                select(ActivityVisit).where(
+                    ActivityVisit.id.in_(activity_comment_visit_ids)
+                )
+            )
+        ).all()
         if activity_comment_visit_ids
         else []
     )
@@ -1248,9 +1322,11 @@ async def list_user_activity(
         visit.activity_id for visit in activity_comment_visits if visit.activity_id
     }
     activity_comment_activities = (
-        db.query(Activity)
-        .filter(Activity.id.in_(activity_comment_activity_ids))
-        .all()
+        (
+            await db.scalars(
+                select(Activity).where(Activity.id.in_(activity_comment_activity_ids))
+            )
+        ).all()
         if activity_comment_activity_ids
         else []
     )
@@ -1258,25 +1334,37 @@ async def list_user_activity(
         activity.id: activity for activity in activity_comment_activities
     }
     journal_entries = (
-        db.query(JournalEntry)
-        .filter(JournalEntry.id.in_(entity_map.get("journal_entry", set())))
-        .all()
+        (
+            await db.scalars(
+                select(JournalEntry).where(
+                    JournalEntry.id.in_(entity_map.get("journal_entry", set()))
+                )
+            )
+        ).all()
         if entity_map.get("journal_entry")
         else []
     )
     journal_entries_by_id = {entry.id: entry for entry in journal_entries}
     tierlists = (
-        db.query(Tierlist)
-        .filter(Tierlist.id.in_(entity_map.get("tierlist", set())))
-        .all()
+        (
+            await db.scalars(
+                select(Tierlist).where(
+                    Tierlist.id.in_(entity_map.get("tierlist", set()))
+                )
+            )
+        ).all()
         if entity_map.get("tierlist")
         else []
     )
     tierlists_by_id = {entry.id: entry for entry in tierlists}
     tierlist_comments = (
-        db.query(TierlistComment)
-        .filter(TierlistComment.id.in_(entity_map.get("tierlist_comment", set())))
-        .all()
+        (
+            await db.scalars(
+                select(TierlistComment).where(
+                    TierlistComment.id.in_(entity_map.get("tierlist_comment", set()))
+                )
+            )
+        ).all()
         if entity_map.get("tierlist_comment")
         else []
     )
@@ -1285,9 +1373,11 @@ async def list_user_activity(
     }
     tierlist_comment_ids = {comment.tierlist_id for comment in tierlist_comments}
     tierlist_comment_targets = (
-        db.query(Tierlist)
-        .filter(Tierlist.id.in_(tierlist_comment_ids))
-        .all()
+        (
+            await db.scalars(
+                select(Tierlist).where(Tierlist.id.in_(tierlist_comment_ids))
+            )
+        ).all()
         if tierlist_comment_ids
         else []
     )
@@ -1309,7 +1399,7 @@ async def list_user_activity(
         elif entry.entity_type == "food_visit":
             visit = food_visits_by_id.get(entry.entity_id)
             if visit:
-                place = db.query(FoodPlace).filter(FoodPlace.id == visit.food_place_id).first()
+                place = visit.food_place
                 entity_title = place.name if place else None
                 entity_subtitle = visit.visited_at.isoformat() if visit.visited_at else None
                 entity_image_url = visit.photo_url or (place.header_url if place else None)
@@ -1340,7 +1430,7 @@ async def list_user_activity(
         elif entry.entity_type == "activity_visit":
             visit = activity_visits_by_id.get(entry.entity_id)
             if visit:
-                activity = db.query(Activity).filter(Activity.id == visit.activity_id).first()
+                activity = visit.activity
                 entity_title = visit.activity_title or (activity.name if activity else None)
                 entity_subtitle = visit.visited_at.isoformat() if visit.visited_at else None
                 entity_image_url = visit.photo_url or (activity.image_url if activity else None)
@@ -1405,7 +1495,7 @@ async def list_user_activity(
 async def update_profile(
     payload: ProfileUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if payload.display_name is not None:
         user.display_name = payload.display_name
@@ -1450,14 +1540,15 @@ async def update_profile(
     if payload.accent_color is not None:
         user.accent_color = payload.accent_color or None
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     devices = (
-        db.query(TrustedDevice)
-        .filter(TrustedDevice.user_id == user.id)
-        .order_by(TrustedDevice.last_seen_at.desc())
-        .all()
-    )
+        await db.scalars(
+            select(TrustedDevice)
+            .where(TrustedDevice.user_id == user.id)
+            .order_by(TrustedDevice.last_seen_at.desc())
+        )
+    ).all()
     return ProfileResponse(
         telegram_uid=user.telegram_uid,
         display_name=user.display_name,
@@ -1484,18 +1575,18 @@ async def update_profile(
 async def change_pin(
     payload: PinChangeRequest,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if user.pin_hash and user.pin_salt:
         if not payload.current_pin:
             raise HTTPException(status_code=400, detail="Current pin required")
-        if not verify_pin_hash(payload.current_pin, user.pin_salt, user.pin_hash):
+        if not await verify_pin_hash(payload.current_pin, user.pin_salt, user.pin_hash):
             raise HTTPException(status_code=401, detail="Invalid pin")
-    pin_hash, pin_salt = hash_pin(payload.new_pin)
+    pin_hash, pin_salt = await hash_pin(payload.new_pin)
     user.pin_hash = pin_hash
     user.pin_salt = pin_salt
     db.add(user)
-    db.commit()
+    await db.commit()
     return PinChangeResponse(status="changed")
 
 
@@ -1503,12 +1594,12 @@ async def change_pin(
 async def verify_current_pin(
     payload: PinVerifyRequest,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if user.pin_hash and user.pin_salt:
         if not payload.current_pin:
             raise HTTPException(status_code=400, detail="Current pin required")
-        if not verify_pin_hash(payload.current_pin, user.pin_salt, user.pin_hash):
+        if not await verify_pin_hash(payload.current_pin, user.pin_salt, user.pin_hash):
             raise HTTPException(status_code=401, detail="Invalid pin")
     return PinCurrentVerifyResponse(status="ok")
 
@@ -1517,40 +1608,40 @@ async def verify_current_pin(
 async def revoke_device(
     device_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    device = (
-        db.query(TrustedDevice)
-        .filter(TrustedDevice.id == device_id, TrustedDevice.user_id == user.id)
-        .first()
+    device = await db.scalar(
+        select(TrustedDevice).where(
+            TrustedDevice.id == device_id, TrustedDevice.user_id == user.id
+        )
     )
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
-    db.delete(device)
-    db.commit()
+    await db.delete(device)
+    await db.commit()
     return ProfileSetResponse(status="deleted")
 
 
 @app.post("/devices/revoke-self", response_model=ProfileSetResponse)
 async def revoke_self(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     x_device_id: str | None = Header(default=None),
 ):
     if not x_device_id:
         raise HTTPException(status_code=400, detail="Device id required")
-    device = (
-        db.query(TrustedDevice)
-        .filter(
+    device = await db.scalar(
+        select(TrustedDevice)
+        .where(
             TrustedDevice.user_id == user.id,
             TrustedDevice.device_id == x_device_id,
         )
-        .first()
+        .limit(1)
     )
     if not device:
         return ProfileSetResponse(status="not_found")
-    db.delete(device)
-    db.commit()
+    await db.delete(device)
+    await db.commit()
     return ProfileSetResponse(status="deleted")
 
 
@@ -1558,7 +1649,7 @@ async def revoke_self(
 async def create_check_in(
     payload: CheckInCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     visited_at = parse_iso_datetime(payload.visited_at)
     check_in = CheckIn(
@@ -1570,8 +1661,8 @@ async def create_check_in(
         visited_at=visited_at,
     )
     db.add(check_in)
-    db.flush()
-    log_user_activity(
+    await refresh_check_in_rollups(db, user.id, [check_in_point(check_in)])
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -1579,8 +1670,8 @@ async def create_check_in(
         entity_id=check_in.id,
         summary=f"Checked in at {check_in.location_label}",
     )
-    db.commit()
-    db.refresh(check_in)
+    await db.commit()
+    await db.refresh(check_in)
     return CheckInOut(
         id=check_in.id,
         location_name=check_in.location_name,
@@ -1597,61 +1688,57 @@ async def list_check_ins(
     month: int | None = None,
     page: int = 1,
     page_size: int = 12,
+    cursor: str | None = None,
+    include_total: bool = True,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     page = max(page, 1)
     page_size = min(max(page_size, 1), 50)
-    query = db.query(CheckIn).filter(CheckIn.user_id == user.id)
+    query = select(CheckIn).where(CheckIn.user_id == user.id)
     if year:
-        start = datetime(year, 1, 1)
-        end = datetime(year + 1, 1, 1)
-        query = query.filter(CheckIn.visited_at >= start, CheckIn.visited_at < end)
-    if month and year:
-        start = datetime(year, month, 1)
-        next_month = datetime(year + (1 if month == 12 else 0), (month % 12) + 1, 1)
-        query = query.filter(
-            CheckIn.visited_at >= start, CheckIn.visited_at < next_month
+        start, end = month_bounds(year, month) if month else year_bounds(year)
+        query = query.where(CheckIn.visited_at >= start, CheckIn.visited_at < end)
+    month_counts = select(func.coalesce(func.sum(CheckInMonthCount.count), 0)).where(
+        CheckInMonthCount.user_id == user.id
+    )
+    # The rollups answer the total without touching check_ins.
+    total = None
+    if include_total and month and year:
+        total = await db.scalar(
+            month_counts.where(CheckInMonthCount.year == year, CheckInMonthCount.month == month)
         )
-    total = query.count()
-    items = (
-        query.order_by(CheckIn.visited_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-    all_total = db.query(CheckIn).filter(CheckIn.user_id == user.id).count()
+    elif include_total and year:
+        total = await db.scalar(month_counts.where(CheckInMonthCount.year == year))
+    keys = [SortKey(CheckIn.visited_at, descending=True), SortKey(CheckIn.id, descending=True)]
+    result = await fetch_page(
+        db,
+        query,
+        keys,
+        lambda item: [item.visited_at, item.id],
+        page,
+        page_size,
+        cursor,
+        include_total=False,
+    )
+    items, next_cursor = result.items, result.next_cursor
     now = datetime.utcnow()
-    year_total = (
-        db.query(CheckIn)
-        .filter(
-            CheckIn.user_id == user.id,
-            CheckIn.visited_at >= datetime(now.year, 1, 1),
-            CheckIn.visited_at < datetime(now.year + 1, 1, 1),
+    all_total = await db.scalar(month_counts)
+    if include_total and not year:
+        total = all_total
+    year_total = await db.scalar(month_counts.where(CheckInMonthCount.year == now.year))
+    month_total = await db.scalar(
+        month_counts.where(
+            CheckInMonthCount.year == now.year, CheckInMonthCount.month == now.month
         )
-        .count()
-    )
-    month_total = (
-        db.query(CheckIn)
-        .filter(
-            CheckIn.user_id == user.id,
-            CheckIn.visited_at >= datetime(now.year, now.month, 1),
-            CheckIn.visited_at
-            < datetime(now.year + (1 if now.month == 12 else 0), (now.month % 12) + 1, 1),
-        )
-        .count()
     )
-    def top_location(base_query):
-        top = (
-            base_query.with_entities(
-                func.coalesce(CheckIn.location_label, CheckIn.location_name).label("label"),
-                func.count(CheckIn.id).label("count"),
-                func.max(CheckIn.latitude).label("latitude"),
-                func.max(CheckIn.longitude).label("longitude"),
-            )
-            .group_by("label")
-            .order_by(func.count(CheckIn.id).desc())
-            .first()
+
+    async def top_location(year: int):
+        top = await db.scalar(
+            select(CheckInLocationCount)
+            .where(CheckInLocationCount.user_id == user.id, CheckInLocationCount.year == year)
+            .order_by(CheckInLocationCount.count.desc(), CheckInLocationCount.label)
+            .limit(1)
         )
         if not top:
             return None
@@ -1662,25 +1749,16 @@ async def list_check_ins(
             longitude=top.longitude,
         )
 
-    top_all_time = top_location(
-        db.query(CheckIn).filter(CheckIn.user_id == user.id)
-    )
-    top_year = top_location(
-        db.query(CheckIn).filter(
-            CheckIn.user_id == user.id,
-            CheckIn.visited_at >= datetime(now.year, 1, 1),
-            CheckIn.visited_at < datetime(now.year + 1, 1, 1),
-        )
-    )
+    top_all_time = await top_location(ALL_TIME)
+    top_year = await top_location(now.year)
     years = [
         str(year)
-        for (year,) in db.query(
-            func.strftime("%Y", CheckIn.visited_at)
+        for year in await db.scalars(
+            select(CheckInMonthCount.year)
+            .where(CheckInMonthCount.user_id == user.id)
+            .distinct()
+            .order_by(CheckInMonthCount.year.desc())
         )
-        .filter(CheckIn.user_id == user.id)
-        .distinct()
-        .order_by(func.strftime("%Y", CheckIn.visited_at).desc())
-        .all()
     ]
     return CheckInListResponse(
         items=[
@@ -1703,6 +1781,7 @@ async def list_check_ins(
             top_year=top_year,
         ),
         years=years,
+        next_cursor=next_cursor,
     )
 
 
@@ -1710,7 +1789,7 @@ async def list_check_ins(
 async def create_food_place(
     payload: FoodPlaceCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     header_url: str | None = None
     if payload.header_data is not None:
@@ -1731,9 +1810,10 @@ async def create_food_place(
         comments=payload.comments,
         updated_at=datetime.utcnow(),
         updated_by_user_id=user.id,
+        stats=FoodPlaceVisitStats(),
     )
     db.add(place)
-    db.flush()
+    await db.flush()
     place_details = [
         f"Name: {place.name}",
         f"Location: {place.location_label}",
@@ -1760,7 +1840,7 @@ async def create_food_place(
     if maps_url:
         buttons.append({"text": "Open in maps", "url": maps_url})
     reply_markup = {"inline_keyboard": [buttons]}
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -1774,8 +1854,8 @@ async def create_food_place(
         bot_reply_markup=reply_markup,
         bot_parse_mode="HTML",
     )
-    db.commit()
-    db.refresh(place)
+    await db.commit()
+    await db.refresh(place)
     return FoodPlaceOut(
         id=place.id,
         name=place.name,
@@ -1800,9 +1880,9 @@ async def update_food_place(
     place_id: int,
     payload: FoodPlaceUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    place = db.query(FoodPlace).filter(FoodPlace.id == place_id).first()
+    place = await db.get(FoodPlace, place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Food place not found")
     if payload.header_data is not None:
@@ -1833,7 +1913,7 @@ async def update_food_place(
         place.comments = payload.comments
     place.updated_at = datetime.utcnow()
     place.updated_by_user_id = user.id
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -1841,18 +1921,11 @@ async def update_food_place(
         entity_id=place.id,
         summary=f"Updated food place {place.name}",
     )
-    db.commit()
-    db.refresh(place)
-    avg_rating = (
-        db.query(func.avg(FoodVisit.rating))
-        .filter(FoodVisit.food_place_id == place.id)
-        .scalar()
-    )
-    visit_count = (
-        db.query(func.count(FoodVisit.id))
-        .filter(FoodVisit.food_place_id == place.id)
-        .scalar()
-    )
+    await db.commit()
+    await db.refresh(place)
+    stats = await db.get(FoodPlaceVisitStats, place.id)
+    avg_rating = stats_avg_rating(stats)
+    visit_count = stats.visit_count if stats else 0
     return FoodPlaceOut(
         id=place.id,
         name=place.name,
@@ -1877,12 +1950,12 @@ async def update_food_place(
 async def delete_food_place(
     place_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    place = db.query(FoodPlace).filter(FoodPlace.id == place_id).first()
+    place = await db.get(FoodPlace, place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Food place not found")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -1890,126 +1963,60 @@ async def delete_food_place(
         entity_id=place.id,
         summary=f"Deleted food place {place.name}",
     )
-    visits = db.query(FoodVisit).filter(FoodVisit.food_place_id == place.id).all()
+    visits = (
+        await db.scalars(select(FoodVisit).where(FoodVisit.food_place_id == place.id))
+    ).all()
     for visit in visits:
         if visit.photo_url:
             maybe_delete_upload(visit.photo_url)
     if place.header_url:
         maybe_delete_upload(place.header_url)
-    db.delete(place)
-    db.commit()
+    await db.delete(place)
+    await db.commit()
     return ProfileSetResponse(status="deleted")
 
 
-@app.get("/food-places", response_model=FoodPlaceListResponse)
-async def list_food_places(
-    page: int = 1,
-    page_size: int = 12,
-    search: str | None = None,
-    status: str | None = None,
-    category: str | None = None,
-    sort_name: str | None = None,
-    sort_rating: str | None = None,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    page = max(page, 1)
-    page_size = min(max(page_size, 1), 50)
-    base_query = db.query(FoodPlace)
-    if search:
-        like = f"%{search}%"
-        base_query = base_query.filter(
-            FoodPlace.name.ilike(like) | FoodPlace.location_label.ilike(like)
-        )
-    if status == "visited":
-        base_query = base_query.filter(
-            db.query(FoodVisit.id)
-            .filter(FoodVisit.food_place_id == FoodPlace.id)
-            .exists()
-        )
-    elif status == "not_visited":
-        base_query = base_query.filter(
-            ~db.query(FoodVisit.id)
-            .filter(FoodVisit.food_place_id == FoodPlace.id)
-            .exists()
-        )
-    if category:
-        base_query = base_query.filter(FoodPlace.cuisine.ilike(f"{category}%"))
-    total = base_query.count()
-    rating_subquery = (
-        db.query(
-            FoodVisit.food_place_id.label("place_id"),
-            func.avg(FoodVisit.rating).label("avg_rating"),
-            func.count(FoodVisit.id).label("visit_count"),
-        )
-        .group_by(FoodVisit.food_place_id)
-        .subquery()
-    )
-    list_query = (
-        db.query(
-            FoodPlace,
-            rating_subquery.c.avg_rating,
-            rating_subquery.c.visit_count,
-        )
-        .outerjoin(rating_subquery, rating_subquery.c.place_id == FoodPlace.id)
-    )
-    if search:
-        like = f"%{search}%"
-        list_query = list_query.filter(
-            FoodPlace.name.ilike(like) | FoodPlace.location_label.ilike(like)
-        )
-    if status == "visited":
-        list_query = list_query.filter(rating_subquery.c.visit_count.isnot(None))
-    elif status == "not_visited":
-        list_query = list_query.filter(rating_subquery.c.visit_count.is_(None))
-    if category:
-        list_query = list_query.filter(FoodPlace.cuisine.ilike(f"{category}%"))
-    if sort_rating in {"low", "high"}:
-        rating_value = func.coalesce(rating_subquery.c.avg_rating, 0)
-        order = rating_value.asc() if sort_rating == "low" else rating_value.desc()
-        list_query = list_query.order_by(order)
-    if sort_name in {"az", "za"}:
-        list_query = list_query.order_by(
-            FoodPlace.name.asc() if sort_name == "az" else FoodPlace.name.desc()
-        )
-    items = (
-        list_query.offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-    all_total = db.query(FoodPlace).count()
+async def build_food_place_stats(db: AsyncSession, now: datetime) -> FoodPlaceStats:
+    all_total = await count_rows(db, select(FoodPlace))
     visited_total = (
-        db.query(func.count(func.distinct(FoodVisit.food_place_id))).scalar() or 0
+        await db.scalar(
+            select(func.count())
+            .select_from(FoodPlaceVisitStats)
+            .where(FoodPlaceVisitStats.visit_count > 0)
+        )
+        or 0
     )
-    now = datetime.utcnow()
-    year_total = (
-        db.query(FoodVisit)
-        .filter(
+    year_total = await count_rows(
+        db,
+        select(FoodVisit).where(
             FoodVisit.visited_at >= datetime(now.year, 1, 1),
             FoodVisit.visited_at < datetime(now.year + 1, 1, 1),
-        )
-        .count()
+        ),
     )
-    def top_place(base_query):
+    async def top_place_in_period(*conditions):
         avg_rating = func.avg(FoodVisit.rating)
         latest_visit = func.max(FoodVisit.visited_at)
         top = (
-            base_query.with_entities(
-                FoodPlace.id.label("id"),
-                FoodPlace.name.label("name"),
-                func.count(FoodVisit.id).label("count"),
-                avg_rating.label("avg_rating"),
-                func.max(FoodPlace.header_url).label("header_url"),
-                latest_visit.label("latest_visit"),
-            )
-            .group_by(FoodPlace.id, FoodPlace.name)
-            .order_by(
-                func.count(FoodVisit.id).desc(),
-                func.coalesce(avg_rating, 0).desc(),
-                latest_visit.desc(),
+            await db.execute(
+                select(
+                    FoodPlace.id.label("id"),
+                    FoodPlace.name.label("name"),
+                    func.count(FoodVisit.id).label("count"),
+                    avg_rating.label("avg_rating"),
+                    func.max(FoodPlace.header_url).label("header_url"),
+                    latest_visit.label("latest_visit"),
+                )
+                .join(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
+                .where(*conditions)
+                .group_by(FoodPlace.id, FoodPlace.name)
+                .order_by(
+                    func.count(FoodVisit.id).desc(),
+                    func.coalesce(avg_rating, 0).desc(),
+                    latest_visit.desc(),
+                )
+                .limit(1)
             )
-            .first()
-        )
+        ).first()
         if not top:
             return None
         return FoodPlaceTop(
@@ -2023,89 +2030,135 @@ async def list_food_places(
             else None,
         )
 
-    def worst_rated_place():
-        avg_rating = func.avg(FoodVisit.rating)
-        latest_visit = func.max(FoodVisit.visited_at)
-        worst = (
-            db.query(FoodPlace)
-            .join(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
-            .filter(FoodVisit.rating.isnot(None))
-            .with_entities(
-                FoodPlace.id.label("id"),
-                FoodPlace.name.label("name"),
-                func.count(FoodVisit.id).label("count"),
-                avg_rating.label("avg_rating"),
-                func.max(FoodPlace.header_url).label("header_url"),
-                latest_visit.label("latest_visit"),
-            )
-            .group_by(FoodPlace.id, FoodPlace.name)
-            .order_by(avg_rating.asc(), latest_visit.desc())
-            .first()
-        )
-        if not worst:
-            return None
-        return FoodPlaceTop(
-            id=worst.id,
-            name=worst.name,
-            count=worst.count,
-            avg_rating=worst.avg_rating,
-            header_url=worst.header_url,
-            latest_visit_at=worst.latest_visit.isoformat()
-            if worst.latest_visit
-            else None,
-        )
-
-    def most_controversial_place():
-        avg_rating = func.avg(FoodVisit.rating)
-        avg_sq = func.avg(FoodVisit.rating * FoodVisit.rating)
-        variance = avg_sq - avg_rating * avg_rating
-        latest_visit = func.max(FoodVisit.visited_at)
-        controversial = (
-            db.query(FoodPlace)
-            .join(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
-            .filter(FoodVisit.rating.isnot(None))
-            .with_entities(
-                FoodPlace.id.label("id"),
-                FoodPlace.name.label("name"),
-                func.count(FoodVisit.id).label("count"),
-                avg_rating.label("avg_rating"),
-                func.max(FoodPlace.header_url).label("header_url"),
-                latest_visit.label("latest_visit"),
-                variance.label("variance"),
+    async def ranked_place(count, *conditions, order_by):
+        top = (
+            await db.execute(
+                select(
+                    FoodPlace.id.label("id"),
+                    FoodPlace.name.label("name"),
+                    count.label("count"),
+                    avg_rating_expr().label("avg_rating"),
+                    FoodPlace.header_url.label("header_url"),
+                    FoodPlaceVisitStats.last_visit_at.label("latest_visit"),
+                )
+                .join(FoodPlaceVisitStats, FoodPlaceVisitStats.food_place_id == FoodPlace.id)
+                .where(*conditions)
+                .order_by(*order_by)
+                .limit(1)
             )
-            .group_by(FoodPlace.id, FoodPlace.name)
-            .having(func.count(FoodVisit.id) >= 2)
-            .order_by(variance.desc(), func.count(FoodVisit.id).desc(), latest_visit.desc())
-            .first()
-        )
-        if not controversial:
+        ).first()
+        if not top:
             return None
         return FoodPlaceTop(
-            id=controversial.id,
-            name=controversial.name,
-            count=controversial.count,
-            avg_rating=controversial.avg_rating,
-            header_url=controversial.header_url,
-            latest_visit_at=controversial.latest_visit.isoformat()
-            if controversial.latest_visit
+            id=top.id,
+            name=top.name,
+            count=top.count,
+            avg_rating=top.avg_rating,
+            header_url=top.header_url,
+            latest_visit_at=top.latest_visit.isoformat()
+            if top.latest_visit
             else None,
         )
 
-    top_all_time = top_place(
-        db.query(FoodPlace)
-        .join(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
+    top_all_time = await ranked_place(
+        FoodPlaceVisitStats.visit_count,
+        FoodPlaceVisitStats.visit_count > 0,
+        order_by=(
+            FoodPlaceVisitStats.visit_count.desc(),
+            func.coalesce(avg_rating_expr(), 0).desc(),
+            FoodPlaceVisitStats.last_visit_at.desc(),
+        ),
     )
-    top_year = top_place(
-        db.query(FoodPlace)
-        .join(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
-        .filter(
-            FoodVisit.visited_at >= datetime(now.year, 1, 1),
-            FoodVisit.visited_at < datetime(now.year + 1, 1, 1),
+    top_year = await top_place_in_period(
+        FoodVisit.visited_at >= datetime(now.year, 1, 1),
+        FoodVisit.visited_at < datetime(now.year + 1, 1, 1),
+    )
+    worst_rated = await ranked_place(
+        FoodPlaceVisitStats.rating_count,
+        FoodPlaceVisitStats.rating_count > 0,
+        order_by=(avg_rating_expr().asc(), FoodPlaceVisitStats.last_visit_at.desc()),
+    )
+    most_controversial = await ranked_place(
+        FoodPlaceVisitStats.rating_count,
+        FoodPlaceVisitStats.rating_count >= 2,
+        order_by=(
+            rating_variance_expr().desc(),
+            FoodPlaceVisitStats.rating_count.desc(),
+            FoodPlaceVisitStats.last_visit_at.desc(),
+        ),
+    )
+    return FoodPlaceStats(
+        total=all_total,
+        visited=visited_total,
+        year=year_total,
+        top_all_time=top_all_time,
+        top_year=top_year,
+        worst_rated=worst_rated,
+        most_controversial=most_controversial,
+    )
+
+
+@app.get("/food-places", response_model=FoodPlaceListResponse)
+async def list_food_places(
+    page: int = 1,
+    page_size: int = 12,
+    search: str | None = None,
+    status: str | None = None,
+    category: str | None = None,
+    sort_name: str | None = None,
+    sort_rating: str | None = None,
+    cursor: str | None = None,
+    include_total: bool = True,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 50)
+    visit_count = func.coalesce(FoodPlaceVisitStats.visit_count, 0)
+    list_query = select(
+        FoodPlace,
+        avg_rating_expr().label("avg_rating"),
+        visit_count.label("visit_count"),
+    ).outerjoin(FoodPlaceVisitStats, FoodPlaceVisitStats.food_place_id == FoodPlace.id)
+    if search:
+        like = f"%{search}%"
+        list_query = list_query.where(
+            FoodPlace.name.ilike(like) | FoodPlace.location_label.ilike(like)
+        )
+    if status == "visited":
+        list_query = list_query.where(visit_count > 0)
+    elif status == "not_visited":
+        list_query = list_query.where(visit_count == 0)
+    if category:
+        list_query = list_query.where(FoodPlace.cuisine_category == category)
+    keys = []
+    if sort_rating in {"low", "high"}:
+        keys.append(
+            SortKey(func.coalesce(avg_rating_expr(), 0), descending=sort_rating == "high")
         )
+    if sort_name in {"az", "za"}:
+        keys.append(SortKey(FoodPlace.name, descending=sort_name == "za"))
+    # Ties (and the unsorted listing) fall back to insertion order on every backend.
+    keys.append(SortKey(FoodPlace.id))
+
+    def key_values(row) -> list:
+        place, avg_rating, _ = row
+        values = []
+        if sort_rating in {"low", "high"}:
+            values.append(avg_rating or 0)
+        if sort_name in {"az", "za"}:
+            values.append(place.name)
+        return [*values, place.id]
+
+    result = await fetch_page(
+        db, list_query, keys, key_values, page, page_size, cursor, include_total
+    )
+    items = result.items
+    now = datetime.utcnow()
+    stats = await stats_cache.get_or_compute(
+        db, "food", now.year, lambda: build_food_place_stats(db, now)
     )
-    worst_rated = worst_rated_place()
-    most_controversial = most_controversial_place()
-    updated_by_users = build_user_lookup(
+    updated_by_users = await build_user_lookup(
         db,
         {place.updated_by_user_id for place, _, _ in items if place.updated_by_user_id},
     )
@@ -2143,16 +2196,9 @@ async def list_food_places(
             )
             for place, avg_rating, visit_count in items
         ],
-        total=total,
-        stats=FoodPlaceStats(
-            total=all_total,
-            visited=visited_total,
-            year=year_total,
-            top_all_time=top_all_time,
-            top_year=top_year,
-            worst_rated=worst_rated,
-            most_controversial=most_controversial,
-        ),
+        total=result.total,
+        stats=stats,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -2160,32 +2206,29 @@ async def list_food_places(
 async def roll_food_place(
     payload: FoodPlaceRollRequest,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     cuisine_categories = set(payload.cuisine_categories or [])
     has_location = payload.latitude is not None and payload.longitude is not None
-    places_query = db.query(FoodPlace).filter(FoodPlace.open.is_(True))
-    places = places_query.all()
+    places_query = select(FoodPlace).where(FoodPlace.open.is_(True))
     if cuisine_categories:
-        places = [
-            place
-            for place in places
-            if place.cuisine
-            and place.cuisine.split(" • ")[0].strip() in cuisine_categories
-        ]
+        places_query = places_query.where(FoodPlace.cuisine_category.in_(cuisine_categories))
+    places = (await db.scalars(places_query)).all()
     if not places:
         return FoodPlaceRollResponse(place=None, radius_km=None)
     place_ids = [place.id for place in places]
-    visits = (
-        db.query(FoodVisit).filter(FoodVisit.food_place_id.in_(place_ids)).all()
-    )
-    visits_by_place: dict[int, list[FoodVisit]] = {}
-    for visit in visits:
-        visits_by_place.setdefault(visit.food_place_id, []).append(visit)
+    stats_by_place = {
+        stats.food_place_id: stats
+        for stats in (
+            await db.scalars(
+                select(FoodPlaceVisitStats).where(FoodPlaceVisitStats.food_place_id.in_(place_ids))
+            )
+        ).all()
+    }
     candidates = []
     for place in places:
-        place_visits = visits_by_place.get(place.id, [])
-        if any(visit.again == "no" for visit in place_visits):
+        stats = stats_by_place.get(place.id)
+        if stats and stats.any_again_no:
             continue
         candidates.append(place)
     if not candidates:
@@ -2215,16 +2258,13 @@ async def roll_food_place(
     visited_yes = []
     visited_maybe = []
     for place in candidates:
-        place_visits = visits_by_place.get(place.id, [])
-        if not place_visits:
+        stats = stats_by_place.get(place.id)
+        if not stats or not stats.visit_count:
             unvisited.append(place)
             continue
-        if any(visit.again == "yes" for visit in place_visits):
+        if stats.any_again_yes:
             visited_yes.append(place)
             continue
-        if any(visit.again == "maybe" for visit in place_visits):
-            visited_maybe.append(place)
-            continue
         visited_maybe.append(place)
     buckets = [
         ("unvisited", 0.6, unvisited),
@@ -2243,18 +2283,11 @@ async def roll_food_place(
             chosen_items = items
             break
     chosen = random.choice(chosen_items)
-    avg_rating = (
-        db.query(func.avg(FoodVisit.rating))
-        .filter(FoodVisit.food_place_id == chosen.id)
-        .scalar()
-    )
-    visit_count = (
-        db.query(func.count(FoodVisit.id))
-        .filter(FoodVisit.food_place_id == chosen.id)
-        .scalar()
-    )
+    stats = stats_by_place.get(chosen.id)
+    avg_rating = stats_avg_rating(stats)
+    visit_count = stats.visit_count if stats else 0
     updated_by = (
-        db.query(User).filter(User.id == chosen.updated_by_user_id).first()
+        await db.get(User, chosen.updated_by_user_id)
         if chosen.updated_by_user_id
         else None
     )
@@ -2285,7 +2318,7 @@ async def roll_food_place(
 async def roll_activity(
     payload: ActivityRollRequest,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     activity_type = payload.activity_type
     if activity_type == "all":
@@ -2295,21 +2328,21 @@ async def roll_activity(
     categories = set(payload.categories or [])
     has_location = payload.latitude is not None and payload.longitude is not None
 
-    query = db.query(Activity)
+    query = select(Activity)
     if activity_type:
-        query = query.filter(Activity.activity_type == activity_type)
+        query = query.where(Activity.activity_type == activity_type)
     if categories:
-        query = query.filter(Activity.category.in_(categories))
-    activities = query.all()
+        query = query.where(Activity.category.in_(categories))
+    activities = (await db.scalars(query)).all()
     if not activities:
         return ActivityRollResponse(activity=None, radius_km=None)
 
     activity_ids = [activity.id for activity in activities]
     visits = (
-        db.query(ActivityVisit)
-        .filter(ActivityVisit.activity_id.in_(activity_ids))
-        .all()
-    )
+        await db.scalars(
+            select(ActivityVisit).where(ActivityVisit.activity_id.in_(activity_ids))
+        )
+    ).all()
     visits_by_activity: dict[int, list[ActivityVisit]] = {}
     for visit in visits:
         visits_by_activity.setdefault(visit.activity_id, []).append(visit)
@@ -2374,11 +2407,10 @@ async def roll_activity(
     elif activity_type == "bucket":
         chosen_pool = buckets
     else:
-        last_exercise_visit = (
-            db.query(func.max(ActivityVisit.visited_at))
+        last_exercise_visit = await db.scalar(
+            select(func.max(ActivityVisit.visited_at))
             .join(Activity, Activity.id == ActivityVisit.activity_id)
-            .filter(Activity.activity_type == "exercise")
-            .scalar()
+            .where(Activity.activity_type == "exercise")
         )
         now = datetime.utcnow()
         use_exercise_weight = (
@@ -2407,7 +2439,7 @@ async def roll_activity(
         return ActivityRollResponse(activity=None, radius_km=radius_km)
     chosen = random.choice(chosen_pool)
     return ActivityRollResponse(
-        activity=serialize_activity(chosen),
+        activity=await serialize_activity(chosen),
         radius_km=radius_km,
     )
 
@@ -2416,7 +2448,7 @@ async def roll_activity(
 async def create_activity(
     payload: ActivityCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     if payload.activity_type not in {"exercise", "bucket"}:
         raise HTTPException(status_code=400, detail="Invalid activity type")
@@ -2444,8 +2476,8 @@ async def create_activity(
         updated_by_user_id=user.id,
     )
     db.add(activity)
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -2454,9 +2486,9 @@ async def create_activity(
         summary=f"Added activity {activity.name}",
         image_url=build_public_url(activity.image_url),
     )
-    db.commit()
-    db.refresh(activity)
-    return serialize_activity(activity)
+    await db.commit()
+    await db.refresh(activity)
+    return await serialize_activity(activity)
 
 
 @app.get("/activities", response_model=ActivityListResponse)
@@ -2471,99 +2503,135 @@ async def list_activities(
     sort: str | None = None,
     page: int = 1,
     page_size: int = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     page = max(page, 1)
     page_size = min(max(page_size, 1), 100)
-    query = db.query(Activity)
+    query = select(Activity)
     if activity_type:
-        query = query.filter(Activity.activity_type == activity_type)
+        query = query.where(Activity.activity_type == activity_type)
     if status == "done":
-        query = query.filter(Activity.done_at.isnot(None))
+        query = query.where(Activity.done_at.isnot(None))
     elif status == "not_done":
-        query = query.filter(Activity.done_at.is_(None))
+        query = query.where(Activity.done_at.is_(None))
     if category:
-        query = query.filter(Activity.category == category)
+        query = query.where(Activity.category == category)
     if rating == "na":
-        query = query.filter(Activity.rating.is_(None))
+        query = query.where(Activity.rating.is_(None))
     elif rating:
-        query = query.filter(Activity.rating == rating)
+        query = query.where(Activity.rating == rating)
     if difficulty:
-        query = query.filter(Activity.difficulty == difficulty)
+        query = query.where(Activity.difficulty == difficulty)
     if max_distance is not None:
-        query = query.filter(
+        query = query.where(
             Activity.distance_km.isnot(None),
             Activity.distance_km <= max_distance,
         )
     if search:
         like = f"%{search.strip()}%"
-        query = query.filter(
+        query = query.where(
             or_(
                 Activity.name.ilike(like),
                 Activity.address.ilike(like),
                 Activity.description.ilike(like),
             )
         )
-    if sort == "za":
-        query = query.order_by(Activity.name.desc())
-    else:
-        query = query.order_by(Activity.name.asc())
-    total = query.count()
-    items = query.offset((page - 1) * page_size).limit(page_size).all()
+    keys = [
+        SortKey(Activity.name, descending=sort == "za"),
+        SortKey(Activity.id, descending=sort == "za"),
+    ]
+    result = await fetch_page(
+        db,
+        query.options(selectinload(Activity.updated_by_user)),
+        keys,
+        lambda item: [item.name, item.id],
+        page,
+        page_size,
+        cursor,
+        include_total,
+    )
     return ActivityListResponse(
-        items=[serialize_activity(item) for item in items],
-        total=total,
+        items=[await serialize_activity(item) for item in result.items],
+        total=result.total,
+        next_cursor=result.next_cursor,
     )
 
 
 @app.get("/activities/stats", response_model=ActivityStats)
 async def get_activity_stats(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     now = datetime.utcnow()
-    activities = db.query(Activity).all()
-    total = len(activities)
-    done_all = sum(1 for item in activities if item.done_at)
-    done_year = sum(
-        1
-        for item in activities
-        if item.done_at and item.done_at.year == now.year
-    )
+    year_start = datetime(now.year, 1, 1)
+    year_end = datetime(now.year + 1, 1, 1)
+    counts = [
+        func.count(Activity.id).label("total"),
+        func.count(Activity.done_at).label("done_all"),
+        func.coalesce(
+            func.sum(
+                case(
+                    (
+                        (Activity.done_at >= year_start) & (Activity.done_at < year_end),
+                        1,
+                    ),
+                    else_=0,
+                )
+            ),
+            0,
+        ).label("done_year"),
+    ]
+    totals = (await db.execute(select(*counts))).one()
 
-    def pick_top_from_visits(base_query) -> ActivityOut | None:
-        top = (
-            base_query.order_by(
-                func.count(ActivityVisit.id).desc(),
-                func.max(ActivityVisit.visited_at).desc(),
-            )
-            .first()
+    async def group_counts(column) -> list[ActivityStatsGroup]:
+        rows = await db.execute(
+            select(column.label("label"), *counts)
+            .group_by(column)
+            .order_by(func.count(Activity.id).desc(), column.asc().nulls_last())
         )
-        if not top:
-            return None
-        activity = db.query(Activity).filter(Activity.id == top.activity_id).first()
-        return serialize_activity(activity) if activity else None
+        return [
+            ActivityStatsGroup(
+                label=row.label,
+                total=row.total,
+                done_all=row.done_all,
+                done_year=row.done_year,
+            )
+            for row in rows
+        ]
 
-    base_visits = (
-        db.query(
-            ActivityVisit.activity_id.label("activity_id"),
+    async def pick_top_from_visits(*conditions) -> ActivityOut | None:
+        visit_counts = (
+            select(
+                ActivityVisit.activity_id.label("activity_id"),
+                func.count(ActivityVisit.id).label("visit_count"),
+                func.max(ActivityVisit.visited_at).label("last_visit"),
+            )
+            .where(*conditions)
+            .group_by(ActivityVisit.activity_id)
+            .subquery()
         )
-        .join(Activity, Activity.id == ActivityVisit.activity_id)
-        .group_by(ActivityVisit.activity_id)
-    )
-    year_start = datetime(now.year, 1, 1)
-    year_end = datetime(now.year + 1, 1, 1)
-    year_visits = base_visits.filter(
-        ActivityVisit.visited_at >= year_start,
-        ActivityVisit.visited_at < year_end,
-    )
+        activity = await db.scalar(
+            select(Activity)
+            .join(visit_counts, visit_counts.c.activity_id == Activity.id)
+            .order_by(visit_counts.c.visit_count.desc(), visit_counts.c.last_visit.desc())
+            .limit(1)
+        )
+        return await serialize_activity(activity) if activity else None
+
     return ActivityStats(
-        total=total,
-        done_all=done_all,
-        done_year=done_year,
-        top_all_time=pick_top_from_visits(base_visits),
-        top_year=pick_top_from_visits(year_visits),
+        total=totals.total,
+        done_all=totals.done_all,
+        done_year=totals.done_year,
+        top_all_time=await pick_top_from_visits(),
+        top_year=await pick_top_from_visits(
+            ActivityVisit.visited_at >= year_start,
+            ActivityVisit.visited_at < year_end,
+        ),
+        by_type=await group_counts(Activity.activity_type),
+        by_category=await group_counts(Activity.category),
     )
 
 
@@ -2571,12 +2639,12 @@ async def get_activity_stats(
 async def get_activity(
     activity_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
-    return serialize_activity(activity)
+    return await serialize_activity(activity)
 
 
 @app.post(
@@ -2587,9 +2655,9 @@ async def create_activity_visit(
     activity_id: int,
     payload: ActivityVisitCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     visited_at = parse_iso_datetime(payload.visited_at) or datetime.utcnow()
@@ -2614,8 +2682,8 @@ async def create_activity_visit(
     if not activity.done_at or visited_at > activity.done_at:
         activity.done_at = visited_at
     db.add(visit)
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -2628,8 +2696,8 @@ async def create_activity_visit(
         ],
         image_url=build_public_url(visit.photo_url or activity.image_url),
     )
-    db.commit()
-    db.refresh(visit)
+    await db.commit()
+    await db.refresh(visit)
     return ActivityVisitOut(
         id=visit.id,
         activity_id=visit.activity_id,
@@ -2654,23 +2722,35 @@ async def list_activity_visits(
     activity_id: int,
     page: int = 1,
     page_size: int = 12,
+    cursor: str | None = None,
+    include_total: bool = True,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     page = max(page, 1)
     page_size = min(max(page_size, 1), 50)
-    base_query = db.query(ActivityVisit).filter(
+    base_query = select(ActivityVisit).where(
         ActivityVisit.activity_id == activity_id,
     )
-    total = base_query.count()
-    last_visit = base_query.with_entities(func.max(ActivityVisit.visited_at)).scalar()
-    items = (
-        base_query.order_by(ActivityVisit.visited_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    last_visit = await db.scalar(
+        base_query.with_only_columns(func.max(ActivityVisit.visited_at))
     )
-    updated_by_users = build_user_lookup(
+    keys = [
+        SortKey(ActivityVisit.visited_at, descending=True),
+        SortKey(ActivityVisit.id, descending=True),
+    ]
+    result = await fetch_page(
+        db,
+        base_query,
+        keys,
+        lambda visit: [visit.visited_at, visit.id],
+        page,
+        page_size,
+        cursor,
+        include_total,
+    )
+    items = result.items
+    updated_by_users = await build_user_lookup(
         db, {visit.updated_by_user_id for visit in items if visit.updated_by_user_id}
     )
     return ActivityVisitListResponse(
@@ -2705,8 +2785,9 @@ async def list_activity_visits(
             )
             for visit in items
         ],
-        total=total,
+        total=result.total,
         last_visit_at=last_visit.isoformat() if last_visit else None,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -2715,7 +2796,7 @@ async def search_activity_visits(
     query: str,
     limit: int = 10,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     needle = query.strip()
     if not needle:
@@ -2723,20 +2804,21 @@ async def search_activity_visits(
     limit = min(max(limit, 1), 20)
     like = f"%{needle.lower()}%"
     results = (
-        db.query(ActivityVisit, Activity)
-        .join(Activity, ActivityVisit.activity_id == Activity.id)
-        .filter(
-            or_(
-                func.lower(Activity.name).like(like),
-                func.lower(Activity.address).like(like),
-                func.lower(ActivityVisit.description).like(like),
-                func.lower(ActivityVisit.activity_title).like(like),
+        await db.execute(
+            select(ActivityVisit, Activity)
+            .join(Activity, ActivityVisit.activity_id == Activity.id)
+            .where(
+                or_(
+                    func.lower(Activity.name).like(like),
+                    func.lower(Activity.address).like(like),
+                    func.lower(ActivityVisit.description).like(like),
+                    func.lower(ActivityVisit.activity_title).like(like),
+                )
             )
+            .order_by(ActivityVisit.visited_at.desc(), ActivityVisit.id.desc())
+            .limit(limit)
         )
-        .order_by(ActivityVisit.visited_at.desc(), ActivityVisit.id.desc())
-        .limit(limit)
-        .all()
-    )
+    ).all()
     items = []
     for visit, activity in results:
         items.append(
@@ -2762,23 +2844,25 @@ async def search_activity_visits(
 async def get_home_timeline(
     limit: int = 5,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     max_limit = min(max(limit, 1), 10)
     food_visits = (
-        db.query(FoodVisit, FoodPlace)
-        .join(FoodPlace, FoodVisit.food_place_id == FoodPlace.id)
-        .order_by(FoodVisit.visited_at.desc(), FoodVisit.id.desc())
-        .limit(max_limit)
-        .all()
-    )
+        await db.execute(
+            select(FoodVisit, FoodPlace)
+            .join(FoodPlace, FoodVisit.food_place_id == FoodPlace.id)
+            .order_by(FoodVisit.visited_at.desc().nulls_last(), FoodVisit.id.desc())
+            .limit(max_limit)
+        )
+    ).all()
     activity_visits = (
-        db.query(ActivityVisit, Activity)
-        .join(Activity, ActivityVisit.activity_id == Activity.id)
-        .order_by(ActivityVisit.visited_at.desc(), ActivityVisit.id.desc())
-        .limit(max_limit)
-        .all()
-    )
+        await db.execute(
+            select(ActivityVisit, Activity)
+            .join(Activity, ActivityVisit.activity_id == Activity.id)
+            .order_by(ActivityVisit.visited_at.desc(), ActivityVisit.id.desc())
+            .limit(max_limit)
+        )
+    ).all()
     items = []
     for visit, place in food_visits:
         items.append(
@@ -2817,15 +2901,17 @@ async def get_home_timeline(
 @app.get("/home/hero", response_model=HomeHeroResponse)
 async def get_home_hero(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     items = []
     latest_food_visit = (
-        db.query(FoodVisit, FoodPlace)
-        .join(FoodPlace, FoodVisit.food_place_id == FoodPlace.id)
-        .order_by(FoodVisit.visited_at.desc(), FoodVisit.id.desc())
-        .first()
-    )
+        await db.execute(
+            select(FoodVisit, FoodPlace)
+            .join(FoodPlace, FoodVisit.food_place_id == FoodPlace.id)
+            .order_by(FoodVisit.visited_at.desc().nulls_last(), FoodVisit.id.desc())
+            .limit(1)
+        )
+    ).first()
     if latest_food_visit:
         visit, place = latest_food_visit
         items.append(
@@ -2839,11 +2925,13 @@ async def get_home_hero(
             }
         )
     latest_activity_visit = (
-        db.query(ActivityVisit, Activity)
-        .join(Activity, ActivityVisit.activity_id == Activity.id)
-        .order_by(ActivityVisit.visited_at.desc(), ActivityVisit.id.desc())
-        .first()
-    )
+        await db.execute(
+            select(ActivityVisit, Activity)
+            .join(Activity, ActivityVisit.activity_id == Activity.id)
+            .order_by(ActivityVisit.visited_at.desc(), ActivityVisit.id.desc())
+            .limit(1)
+        )
+    ).first()
     if latest_activity_visit:
         visit, activity = latest_activity_visit
         title = visit.activity_title or activity.name
@@ -2858,10 +2946,10 @@ async def get_home_hero(
                 "activity_id": activity.id,
             }
         )
-    latest_food_place = (
-        db.query(FoodPlace)
+    latest_food_place = await db.scalar(
+        select(FoodPlace)
         .order_by(FoodPlace.created_at.desc(), FoodPlace.id.desc())
-        .first()
+        .limit(1)
     )
     if latest_food_place:
         items.append(
@@ -2886,15 +2974,13 @@ async def update_activity_visit(
     visit_id: int,
     payload: ActivityVisitUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(ActivityVisit)
-        .filter(
+    visit = await db.scalar(
+        select(ActivityVisit).where(
             ActivityVisit.id == visit_id,
             ActivityVisit.activity_id == activity_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
@@ -2919,11 +3005,11 @@ async def update_activity_visit(
                 maybe_delete_upload(previous_photo)
             visit.photo_url = None
     if not visit.activity_title:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
+        activity = await db.get(Activity, activity_id)
         visit.activity_title = activity.name if activity else None
     visit.updated_at = datetime.utcnow()
     visit.updated_by_user_id = user.id
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -2931,9 +3017,9 @@ async def update_activity_visit(
         entity_id=visit.id,
         summary=f"Updated activity visit {visit.activity_title or 'activity'}",
     )
-    db.commit()
-    update_activity_done_at(db, activity_id)
-    db.refresh(visit)
+    await db.commit()
+    await update_activity_done_at(db, activity_id)
+    await db.refresh(visit)
     return ActivityVisitOut(
         id=visit.id,
         activity_id=visit.activity_id,
@@ -2955,19 +3041,17 @@ async def delete_activity_visit(
     activity_id: int,
     visit_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(ActivityVisit)
-        .filter(
+    visit = await db.scalar(
+        select(ActivityVisit).where(
             ActivityVisit.id == visit_id,
             ActivityVisit.activity_id == activity_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -2977,9 +3061,9 @@ async def delete_activity_visit(
     )
     if visit.photo_url:
         maybe_delete_upload(visit.photo_url)
-    db.delete(visit)
-    db.commit()
-    update_activity_done_at(db, activity_id)
+    await db.delete(visit)
+    await db.commit()
+    await update_activity_done_at(db, activity_id)
     return {"status": "ok"}
 
 
@@ -2991,25 +3075,24 @@ async def list_activity_visit_comments(
     activity_id: int,
     visit_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(ActivityVisit)
-        .filter(
+    visit = await db.scalar(
+        select(ActivityVisit).where(
             ActivityVisit.id == visit_id,
             ActivityVisit.activity_id == activity_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
     comments = (
-        db.query(ActivityVisitComment, User)
-        .join(User, User.id == ActivityVisitComment.user_id)
-        .filter(ActivityVisitComment.visit_id == visit_id)
-        .order_by(ActivityVisitComment.created_at.desc())
-        .all()
-    )
+        await db.execute(
+            select(ActivityVisitComment, User)
+            .join(User, User.id == ActivityVisitComment.user_id)
+            .where(ActivityVisitComment.visit_id == visit_id)
+            .order_by(ActivityVisitComment.created_at.desc())
+        )
+    ).all()
     return ActivityVisitCommentListResponse(
         items=[
             ActivityVisitCommentOut(
@@ -3034,15 +3117,13 @@ async def create_activity_visit_comment(
     visit_id: int,
     payload: ActivityVisitCommentCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(ActivityVisit)
-        .filter(
+    visit = await db.scalar(
+        select(ActivityVisit).where(
             ActivityVisit.id == visit_id,
             ActivityVisit.activity_id == activity_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
@@ -3052,14 +3133,10 @@ async def create_activity_visit_comment(
         body=payload.body,
     )
     db.add(comment)
-    activity = (
-        db.query(Activity)
-        .filter(Activity.id == visit.activity_id)
-        .first()
-    )
+    activity = await db.get(Activity, visit.activity_id)
     summary_target = activity.name if activity else "an activity visit"
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -3068,8 +3145,8 @@ async def create_activity_visit_comment(
         summary=f"commented on {summary_target}",
         details=[f'Comment: "{comment.body}"'],
     )
-    db.commit()
-    db.refresh(comment)
+    await db.commit()
+    await db.refresh(comment)
     return ActivityVisitCommentOut(
         id=comment.id,
         body=comment.body,
@@ -3088,36 +3165,28 @@ async def delete_activity_visit_comment(
     visit_id: int,
     comment_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    comment = (
-        db.query(ActivityVisitComment)
-        .filter(
+    comment = await db.scalar(
+        select(ActivityVisitComment).where(
             ActivityVisitComment.id == comment_id,
             ActivityVisitComment.visit_id == visit_id,
             ActivityVisitComment.user_id == user.id,
         )
-        .first()
     )
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    visit = (
-        db.query(ActivityVisit)
-        .filter(
+    visit = await db.scalar(
+        select(ActivityVisit).where(
             ActivityVisit.id == visit_id,
             ActivityVisit.activity_id == activity_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
-    activity = (
-        db.query(Activity)
-        .filter(Activity.id == visit.activity_id)
-        .first()
-    )
+    activity = await db.get(Activity, visit.activity_id)
     summary_target = activity.name if activity else "an activity visit"
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -3125,12 +3194,13 @@ async def delete_activity_visit_comment(
         entity_id=comment.id,
         summary=f"deleted a comment on {summary_target}",
     )
-    db.delete(comment)
-    db.commit()
+    await db.delete(comment)
+    await db.commit()
     return {"status": "ok"}
 
 
-def serialize_journal_entry(entry: JournalEntry) -> JournalEntryOut:
+async def serialize_journal_entry(entry: JournalEntry) -> JournalEntryOut:
+    author = await entry.awaitable_attrs.user
     links = []
     photos = []
     if entry.links_json:
@@ -3153,15 +3223,17 @@ def serialize_journal_entry(entry: JournalEntry) -> JournalEntryOut:
         is_public=entry.is_public,
         links=links,
         photos=photos,
-        author_name=entry.user.display_name if entry.user else None,
-        author_avatar_url=entry.user.avatar_url if entry.user else None,
-        author_telegram_uid=entry.user.telegram_uid if entry.user else None,
+        author_name=author.display_name if author else None,
+        author_avatar_url=author.avatar_url if author else None,
+        author_telegram_uid=author.telegram_uid if author else None,
         created_at=entry.created_at.isoformat(),
         updated_at=entry.updated_at.isoformat(),
     )
 
 
-def serialize_tierlist(tierlist: Tierlist) -> TierlistOut:
+async def serialize_tierlist(tierlist: Tierlist) -> TierlistOut:
+    created_by = await tierlist.awaitable_attrs.user
+    updated_by = await tierlist.awaitable_attrs.updated_by_user
     tiers = []
     if tierlist.tiers_json:
         try:
@@ -3176,24 +3248,12 @@ def serialize_tierlist(tierlist: Tierlist) -> TierlistOut:
         tiers=tiers,
         created_at=tierlist.created_at.isoformat(),
         updated_at=tierlist.updated_at.isoformat() if tierlist.updated_at else None,
-        created_by_name=tierlist.user.display_name if tierlist.user else None,
-        created_by_avatar_url=tierlist.user.avatar_url if tierlist.user else None,
-        created_by_telegram_uid=tierlist.user.telegram_uid if tierlist.user else None,
-        updated_by_name=(
-            tierlist.updated_by_user.display_name
-            if tierlist.updated_by_user
-            else None
-        ),
-        updated_by_avatar_url=(
-            tierlist.updated_by_user.avatar_url
-            if tierlist.updated_by_user
-            else None
-        ),
-        updated_by_telegram_uid=(
-            tierlist.updated_by_user.telegram_uid
-            if tierlist.updated_by_user
-            else None
-        ),
+        created_by_name=created_by.display_name if created_by else None,
+        created_by_avatar_url=created_by.avatar_url if created_by else None,
+        created_by_telegram_uid=created_by.telegram_uid if created_by else None,
+        updated_by_name=updated_by.display_name if updated_by else None,
+        updated_by_avatar_url=updated_by.avatar_url if updated_by else None,
+        updated_by_telegram_uid=updated_by.telegram_uid if updated_by else None,
     )
 
 
@@ -3201,7 +3261,7 @@ def serialize_tierlist(tierlist: Tierlist) -> TierlistOut:
 async def create_journal_entry(
     payload: JournalEntryCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     entry_date = parse_iso_datetime(payload.entry_date)
     links = normalize_journal_links(payload.links)
@@ -3219,8 +3279,8 @@ async def create_journal_entry(
         updated_at=datetime.utcnow(),
     )
     db.add(entry)
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -3228,9 +3288,9 @@ async def create_journal_entry(
         entity_id=entry.id,
         summary=f"Added journal entry {entry.title}",
     )
-    db.commit()
-    db.refresh(entry)
-    return serialize_journal_entry(entry)
+    await db.commit()
+    await db.refresh(entry)
+    return await serialize_journal_entry(entry)
 
 
 @app.put("/journals/{entry_id}", response_model=JournalEntryOut)
@@ -3238,9 +3298,9 @@ async def update_journal_entry(
     entry_id: int,
     payload: JournalEntryUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    entry = db.query(JournalEntry).filter(JournalEntry.id == entry_id).first()
+    entry = await db.get(JournalEntry, entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
     if entry.user_id != user.id:
@@ -3271,7 +3331,7 @@ async def update_journal_entry(
         entry.photos_json = json.dumps(photos) if photos else None
     entry.updated_at = datetime.utcnow()
     db.add(entry)
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -3279,33 +3339,43 @@ async def update_journal_entry(
         entity_id=entry.id,
         summary=f"Updated journal entry {entry.title}",
     )
-    db.commit()
-    db.refresh(entry)
-    return serialize_journal_entry(entry)
+    await db.commit()
+    await db.refresh(entry)
+    return await serialize_journal_entry(entry)
 
 
 @app.get("/journals", response_model=JournalEntryListResponse)
 async def list_journal_entries(
     page: int = 1,
     page_size: int = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     page = max(page, 1)
     page_size = max(min(page_size, 200), 1)
-    base_query = db.query(JournalEntry).filter(
+    base_query = select(JournalEntry).where(
         or_(JournalEntry.is_public == True, JournalEntry.user_id == user.id)
     )
-    total = base_query.count()
-    entries = (
-        base_query.order_by(JournalEntry.entry_date.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    keys = [
+        SortKey(JournalEntry.entry_date, descending=True),
+        SortKey(JournalEntry.id, descending=True),
+    ]
+    result = await fetch_page(
+        db,
+        base_query.options(selectinload(JournalEntry.user)),
+        keys,
+        lambda entry: [entry.entry_date, entry.id],
+        page,
+        page_size,
+        cursor,
+        include_total,
     )
     return JournalEntryListResponse(
-        items=[serialize_journal_entry(entry) for entry in entries],
-        total=total,
+        items=[await serialize_journal_entry(entry) for entry in result.items],
+        total=result.total,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -3313,28 +3383,28 @@ async def list_journal_entries(
 async def fetch_journal_entry(
     entry_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    entry = db.query(JournalEntry).filter(JournalEntry.id == entry_id).first()
+    entry = await db.get(JournalEntry, entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
     if not entry.is_public and entry.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    return serialize_journal_entry(entry)
+    return await serialize_journal_entry(entry)
 
 
 @app.delete("/journals/{entry_id}")
 async def delete_journal_entry(
     entry_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    entry = db.query(JournalEntry).filter(JournalEntry.id == entry_id).first()
+    entry = await db.get(JournalEntry, entry_id)
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
     if entry.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -3349,8 +3419,8 @@ async def delete_journal_entry(
             photos = []
         for photo_url in photos:
             maybe_delete_upload(photo_url)
-    db.delete(entry)
-    db.commit()
+    await db.delete(entry)
+    await db.commit()
     return {"status": "ok"}
 
 
@@ -3358,7 +3428,7 @@ async def delete_journal_entry(
 async def create_tierlist(
     payload: TierlistCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     header_url: str | None = None
     if payload.header_data is not None:
@@ -3377,8 +3447,8 @@ async def create_tierlist(
         updated_by_user_id=user.id,
     )
     db.add(tierlist)
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -3386,9 +3456,9 @@ async def create_tierlist(
         entity_id=tierlist.id,
         summary=f"Added tierlist {tierlist.title}",
     )
-    db.commit()
-    db.refresh(tierlist)
-    return serialize_tierlist(tierlist)
+    await db.commit()
+    await db.refresh(tierlist)
+    return await serialize_tierlist(tierlist)
 
 
 @app.patch("/tierlists/{tierlist_id}", response_model=TierlistOut)
@@ -3396,9 +3466,9 @@ async def update_tierlist(
     tierlist_id: int,
     payload: TierlistUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    tierlist = db.query(Tierlist).filter(Tierlist.id == tierlist_id).first()
+    tierlist = await db.get(Tierlist, tierlist_id)
     if not tierlist:
         raise HTTPException(status_code=404, detail="Tierlist not found")
     if payload.header_data is not None:
@@ -3421,7 +3491,7 @@ async def update_tierlist(
     tierlist.updated_at = datetime.utcnow()
     tierlist.updated_by_user_id = user.id
     db.add(tierlist)
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -3429,31 +3499,40 @@ async def update_tierlist(
         entity_id=tierlist.id,
         summary=f"Updated tierlist {tierlist.title}",
     )
-    db.commit()
-    db.refresh(tierlist)
-    return serialize_tierlist(tierlist)
+    await db.commit()
+    await db.refresh(tierlist)
+    return await serialize_tierlist(tierlist)
 
 
 @app.get("/tierlists", response_model=TierlistListResponse)
 async def list_tierlists(
     page: int = 1,
     page_size: int = 50,
+    cursor: str | None = None,
+    include_total: bool = True,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     page = max(page, 1)
     page_size = max(min(page_size, 200), 1)
-    base_query = db.query(Tierlist)
-    total = base_query.count()
-    tierlists = (
-        base_query.order_by(Tierlist.title.asc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    base_query = select(Tierlist)
+    keys = [SortKey(Tierlist.title), SortKey(Tierlist.id)]
+    result = await fetch_page(
+        db,
+        base_query.options(
+            selectinload(Tierlist.user), selectinload(Tierlist.updated_by_user)
+        ),
+        keys,
+        lambda tierlist: [tierlist.title, tierlist.id],
+        page,
+        page_size,
+        cursor,
+        include_total,
     )
     return TierlistListResponse(
-        items=[serialize_tierlist(entry) for entry in tierlists],
-        total=total,
+        items=[await serialize_tierlist(entry) for entry in result.items],
+        total=result.total,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -3461,24 +3540,24 @@ async def list_tierlists(
 async def fetch_tierlist(
     tierlist_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    tierlist = db.query(Tierlist).filter(Tierlist.id == tierlist_id).first()
+    tierlist = await db.get(Tierlist, tierlist_id)
     if not tierlist:
         raise HTTPException(status_code=404, detail="Tierlist not found")
-    return serialize_tierlist(tierlist)
+    return await serialize_tierlist(tierlist)
 
 
 @app.delete("/tierlists/{tierlist_id}")
 async def delete_tierlist(
     tierlist_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    tierlist = db.query(Tierlist).filter(Tierlist.id == tierlist_id).first()
+    tierlist = await db.get(Tierlist, tierlist_id)
     if not tierlist:
         raise HTTPException(status_code=404, detail="Tierlist not found")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -3488,8 +3567,8 @@ async def delete_tierlist(
     )
     if tierlist.header_url:
         maybe_delete_upload(tierlist.header_url)
-    db.delete(tierlist)
-    db.commit()
+    await db.delete(tierlist)
+    await db.commit()
     return {"status": "ok"}
 
 
@@ -3500,18 +3579,19 @@ async def delete_tierlist(
 async def list_tierlist_comments(
     tierlist_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    tierlist = db.query(Tierlist).filter(Tierlist.id == tierlist_id).first()
+    tierlist = await db.get(Tierlist, tierlist_id)
     if not tierlist:
         raise HTTPException(status_code=404, detail="Tierlist not found")
     comments = (
-        db.query(TierlistComment, User)
-        .join(User, User.id == TierlistComment.user_id)
-        .filter(TierlistComment.tierlist_id == tierlist_id)
-        .order_by(TierlistComment.created_at.desc())
-        .all()
-    )
+        await db.execute(
+            select(TierlistComment, User)
+            .join(User, User.id == TierlistComment.user_id)
+            .where(TierlistComment.tierlist_id == tierlist_id)
+            .order_by(TierlistComment.created_at.desc())
+        )
+    ).all()
     return TierlistCommentListResponse(
         items=[
             TierlistCommentOut(
@@ -3535,9 +3615,9 @@ async def create_tierlist_comment(
     tierlist_id: int,
     payload: TierlistCommentCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    tierlist = db.query(Tierlist).filter(Tierlist.id == tierlist_id).first()
+    tierlist = await db.get(Tierlist, tierlist_id)
     if not tierlist:
         raise HTTPException(status_code=404, detail="Tierlist not found")
     comment = TierlistComment(
@@ -3546,8 +3626,8 @@ async def create_tierlist_comment(
         body=payload.body.strip(),
     )
     db.add(comment)
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -3556,8 +3636,8 @@ async def create_tierlist_comment(
         summary=f"commented on {tierlist.title}",
         details=[f'Comment: "{comment.body}"'],
     )
-    db.commit()
-    db.refresh(comment)
+    await db.commit()
+    await db.refresh(comment)
     return TierlistCommentOut(
         id=comment.id,
         body=comment.body,
@@ -3576,23 +3656,21 @@ async def delete_tierlist_comment(
     tierlist_id: int,
     comment_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    comment = (
-        db.query(TierlistComment)
-        .filter(
+    comment = await db.scalar(
+        select(TierlistComment).where(
             TierlistComment.id == comment_id,
             TierlistComment.tierlist_id == tierlist_id,
         )
-        .first()
     )
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     if comment.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    tierlist = db.query(Tierlist).filter(Tierlist.id == tierlist_id).first()
+    tierlist = await db.get(Tierlist, tierlist_id)
     summary_target = tierlist.title if tierlist else "a tierlist"
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -3600,8 +3678,8 @@ async def delete_tierlist_comment(
         entity_id=comment.id,
         summary=f"deleted a comment on {summary_target}",
     )
-    db.delete(comment)
-    db.commit()
+    await db.delete(comment)
+    await db.commit()
     return ProfileSetResponse(status="deleted")
 
 
@@ -3610,9 +3688,9 @@ async def update_activity(
     activity_id: int,
     payload: ActivityUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     if payload.activity_type and payload.activity_type not in {"exercise", "bucket"}:
@@ -3657,7 +3735,7 @@ async def update_activity(
     activity.updated_by_user_id = user.id
 
     db.add(activity)
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -3665,21 +3743,21 @@ async def update_activity(
         entity_id=activity.id,
         summary=f"Updated activity {activity.name}",
     )
-    db.commit()
-    db.refresh(activity)
-    return serialize_activity(activity)
+    await db.commit()
+    await db.refresh(activity)
+    return await serialize_activity(activity)
 
 
 @app.delete("/activities/{activity_id}")
 async def delete_activity(
     activity_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -3687,41 +3765,36 @@ async def delete_activity(
         entity_id=activity.id,
         summary=f"Deleted activity {activity.name}",
     )
-    visits = db.query(ActivityVisit).filter(ActivityVisit.activity_id == activity.id).all()
+    visits = (
+        await db.scalars(
+            select(ActivityVisit).where(ActivityVisit.activity_id == activity.id)
+        )
+    ).all()
     for visit in visits:
         if visit.photo_url:
             maybe_delete_upload(visit.photo_url)
     maybe_delete_upload(activity.image_url)
-    db.delete(activity)
-    db.commit()
+    await db.delete(activity)
+    await db.commit()
     return {"status": "deleted"}
 
 
 @app.get("/food-places/featured", response_model=FoodPlaceOut | None)
 async def get_featured_food_place(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    place = (
-        db.query(FoodPlace)
-        .filter(FoodPlace.open.is_(True))
+    place = await db.scalar(
+        select(FoodPlace).where(FoodPlace.open.is_(True))
         .order_by(func.random())
-        .first()
     )
     if not place:
         return None
-    avg_rating = (
-        db.query(func.avg(FoodVisit.rating))
-        .filter(FoodVisit.food_place_id == place.id)
-        .scalar()
-    )
-    visit_count = (
-        db.query(func.count(FoodVisit.id))
-        .filter(FoodVisit.food_place_id == place.id)
-        .scalar()
-    )
+    stats = await db.get(FoodPlaceVisitStats, place.id)
+    avg_rating = stats_avg_rating(stats)
+    visit_count = stats.visit_count if stats else 0
     updated_by = (
-        db.query(User).filter(User.id == place.updated_by_user_id).first()
+        await db.get(User, place.updated_by_user_id)
         if place.updated_by_user_id
         else None
     )
@@ -3748,25 +3821,17 @@ async def get_featured_food_place(
 @app.get("/food-places/cuisine-stats", response_model=FoodCuisineStatsResponse)
 async def get_food_cuisine_stats(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    rows = (
-        db.query(FoodPlace.cuisine, FoodVisit.id)
-        .join(FoodVisit, FoodVisit.food_place_id == FoodPlace.id)
-        .all()
-    )
-    counts: dict[str, int] = {}
-    for cuisine, _ in rows:
-        if not cuisine:
-            continue
-        category = cuisine.split(" • ")[0].strip()
-        if not category:
-            continue
-        counts[category] = counts.get(category, 0) + 1
-    items = [
-        {"label": label, "count": count}
-        for label, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)
-    ]
+    visit_count = func.sum(FoodPlaceVisitStats.visit_count)
+    rows = await db.execute(
+        select(FoodPlace.cuisine_category, visit_count)
+        .join(FoodPlaceVisitStats, FoodPlaceVisitStats.food_place_id == FoodPlace.id)
+        .where(FoodPlace.cuisine_category.isnot(None), FoodPlaceVisitStats.visit_count > 0)
+        .group_by(FoodPlace.cuisine_category)
+        .order_by(visit_count.desc(), FoodPlace.cuisine_category)
+    )
+    items = [{"label": label, "count": count} for label, count in rows]
     return FoodCuisineStatsResponse(items=items)
 
 
@@ -3774,23 +3839,16 @@ async def get_food_cuisine_stats(
 async def get_food_place(
     place_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    place = db.query(FoodPlace).filter(FoodPlace.id == place_id).first()
+    place = await db.get(FoodPlace, place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Food place not found")
-    avg_rating = (
-        db.query(func.avg(FoodVisit.rating))
-        .filter(FoodVisit.food_place_id == place.id)
-        .scalar()
-    )
-    visit_count = (
-        db.query(func.count(FoodVisit.id))
-        .filter(FoodVisit.food_place_id == place.id)
-        .scalar()
-    )
+    stats = await db.get(FoodPlaceVisitStats, place.id)
+    avg_rating = stats_avg_rating(stats)
+    visit_count = stats.visit_count if stats else 0
     updated_by = (
-        db.query(User).filter(User.id == place.updated_by_user_id).first()
+        await db.get(User, place.updated_by_user_id)
         if place.updated_by_user_id
         else None
     )
@@ -3819,9 +3877,9 @@ async def create_food_visit(
     place_id: int,
     payload: FoodVisitCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    place = db.query(FoodPlace).filter(FoodPlace.id == place_id).first()
+    place = await db.get(FoodPlace, place_id)
     if not place:
         raise HTTPException(status_code=404, detail="Food place not found")
     visited_at = parse_iso_datetime(payload.visited_at)
@@ -3837,12 +3895,12 @@ async def create_food_visit(
         description=payload.description,
         again=payload.again,
         photo_url=photo_url,
-        dishes=json.dumps(dishes) if dishes else None,
+        dish_items=build_dish_rows(dishes),
         updated_at=datetime.utcnow(),
         updated_by_user_id=user.id,
     )
     db.add(visit)
-    db.flush()
+    await refresh_food_place_stats(db, place_id)
     dish_lines = []
     for dish in dishes:
         rating = dish.get("rating")
@@ -3889,7 +3947,7 @@ async def create_food_visit(
     if maps_url:
         buttons.append({"text": "Open in maps", "url": maps_url})
     reply_markup = {"inline_keyboard": [buttons]}
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -3903,8 +3961,8 @@ async def create_food_visit(
         bot_reply_markup=reply_markup,
         bot_parse_mode="HTML",
     )
-    db.commit()
-    db.refresh(visit)
+    await db.commit()
+    await db.refresh(visit)
     return FoodVisitOut(
         id=visit.id,
         food_place_id=visit.food_place_id,
@@ -3927,26 +3985,39 @@ async def list_food_visits(
     place_id: int,
     page: int = 1,
     page_size: int = 12,
+    cursor: str | None = None,
+    include_total: bool = True,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     page = max(page, 1)
     page_size = min(max(page_size, 1), 50)
-    base_query = db.query(FoodVisit).filter(FoodVisit.food_place_id == place_id)
-    total = base_query.count()
-    last_visit = base_query.with_entities(func.max(FoodVisit.visited_at)).scalar()
-    items = (
-        base_query.order_by(FoodVisit.visited_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-    updated_by_users = build_user_lookup(
+    base_query = select(FoodVisit).where(FoodVisit.food_place_id == place_id)
+    last_visit = await db.scalar(
+        base_query.with_only_columns(func.max(FoodVisit.visited_at))
+    )
+    # Undated visits sort last; the bare column keeps the page on the index.
+    keys = [
+        SortKey(FoodVisit.visited_at, descending=True, nulls_last=True),
+        SortKey(FoodVisit.id, descending=True),
+    ]
+    result = await fetch_page(
+        db,
+        base_query.options(selectinload(FoodVisit.dish_items)),
+        keys,
+        lambda visit: [visit.visited_at, visit.id],
+        page,
+        page_size,
+        cursor,
+        include_total,
+    )
+    items = result.items
+    updated_by_users = await build_user_lookup(
         db, {visit.updated_by_user_id for visit in items if visit.updated_by_user_id}
     )
     results = []
     for visit in items:
-        dishes = decode_food_visit_dishes(visit.dishes)
+        dishes = serialize_dishes(visit.dish_items)
         updated_by = updated_by_users.get(visit.updated_by_user_id)
         results.append(
             FoodVisitOut(
@@ -3967,8 +4038,9 @@ async def list_food_visits(
         )
     return FoodVisitListResponse(
         items=results,
-        total=total,
+        total=result.total,
         last_visit_at=last_visit.isoformat() if last_visit else None,
+        next_cursor=result.next_cursor,
     )
 
 
@@ -3977,7 +4049,7 @@ async def search_food_visits(
     query: str,
     limit: int = 10,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     needle = query.strip()
     if not needle:
@@ -3985,19 +4057,20 @@ async def search_food_visits(
     limit = min(max(limit, 1), 20)
     like = f"%{needle.lower()}%"
     results = (
-        db.query(FoodVisit, FoodPlace)
-        .join(FoodPlace, FoodVisit.food_place_id == FoodPlace.id)
-        .filter(
-            or_(
-                func.lower(FoodPlace.name).like(like),
-                func.lower(FoodPlace.location_label).like(like),
-                func.lower(FoodVisit.description).like(like),
+        await db.execute(
+            select(FoodVisit, FoodPlace)
+            .join(FoodPlace, FoodVisit.food_place_id == FoodPlace.id)
+            .where(
+                or_(
+                    func.lower(FoodPlace.name).like(like),
+                    func.lower(FoodPlace.location_label).like(like),
+                    func.lower(FoodVisit.description).like(like),
+                )
             )
+            .order_by(FoodVisit.visited_at.desc().nulls_last(), FoodVisit.id.desc())
+            .limit(limit)
         )
-        .order_by(FoodVisit.visited_at.desc(), FoodVisit.id.desc())
-        .limit(limit)
-        .all()
-    )
+    ).all()
     items = []
     for visit, place in results:
         items.append(
@@ -4023,15 +4096,13 @@ async def update_food_visit(
     visit_id: int,
     payload: FoodVisitUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(FoodVisit)
-        .filter(
+    visit = await db.scalar(
+        select(FoodVisit).where(
             FoodVisit.id == visit_id,
             FoodVisit.food_place_id == place_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Food visit not found")
@@ -4045,9 +4116,11 @@ async def update_food_visit(
         visit.again = payload.again
     if payload.dishes is not None:
         dishes = normalize_food_visit_dishes(payload.dishes)
-        visit.dishes = json.dumps(dishes) if dishes else None
+        # Delete first: replacing the collection would insert before deleting.
+        await db.execute(delete(FoodVisitDish).where(FoodVisitDish.visit_id == visit.id))
+        db.add_all(build_dish_rows(dishes, visit.id))
     else:
-        dishes = decode_food_visit_dishes(visit.dishes)
+        dishes = serialize_dishes(await visit.awaitable_attrs.dish_items)
     if payload.photo_data is not None:
         previous_photo = visit.photo_url
         if payload.photo_data == "":
@@ -4060,7 +4133,7 @@ async def update_food_visit(
                 maybe_delete_upload(previous_photo)
     visit.updated_at = datetime.utcnow()
     visit.updated_by_user_id = user.id
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -4068,8 +4141,9 @@ async def update_food_visit(
         entity_id=visit.id,
         summary="Updated food visit",
     )
-    db.commit()
-    db.refresh(visit)
+    await refresh_food_place_stats(db, place_id)
+    await db.commit()
+    await db.refresh(visit)
     return FoodVisitOut(
         id=visit.id,
         food_place_id=visit.food_place_id,
@@ -4092,19 +4166,17 @@ async def delete_food_visit(
     place_id: int,
     visit_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(FoodVisit)
-        .filter(
+    visit = await db.scalar(
+        select(FoodVisit).where(
             FoodVisit.id == visit_id,
             FoodVisit.food_place_id == place_id,
         )
-        .first()
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Food visit not found")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -4114,8 +4186,9 @@ async def delete_food_visit(
     )
     if visit.photo_url:
         maybe_delete_upload(visit.photo_url)
-    db.delete(visit)
-    db.commit()
+    await db.delete(visit)
+    await refresh_food_place_stats(db, place_id)
+    await db.commit()
     return ProfileSetResponse(status="deleted")
 
 
@@ -4127,23 +4200,24 @@ async def list_food_visit_comments(
     place_id: int,
     visit_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     _ = user
-    visit = (
-        db.query(FoodVisit)
-        .filter(FoodVisit.id == visit_id, FoodVisit.food_place_id == place_id)
-        .first()
+    visit = await db.scalar(
+        select(FoodVisit).where(
+            FoodVisit.id == visit_id, FoodVisit.food_place_id == place_id
+        )
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Food visit not found")
     items = (
-        db.query(FoodVisitComment, User)
-        .join(User, User.id == FoodVisitComment.user_id)
-        .filter(FoodVisitComment.visit_id == visit_id)
-        .order_by(FoodVisitComment.created_at.desc())
-        .all()
-    )
+        await db.execute(
+            select(FoodVisitComment, User)
+            .join(User, User.id == FoodVisitComment.user_id)
+            .where(FoodVisitComment.visit_id == visit_id)
+            .order_by(FoodVisitComment.created_at.desc())
+        )
+    ).all()
     return FoodVisitCommentListResponse(
         items=[
             FoodVisitCommentOut(
@@ -4168,12 +4242,12 @@ async def create_food_visit_comment(
     visit_id: int,
     payload: FoodVisitCommentCreate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    visit = (
-        db.query(FoodVisit)
-        .filter(FoodVisit.id == visit_id, FoodVisit.food_place_id == place_id)
-        .first()
+    visit = await db.scalar(
+        select(FoodVisit).where(
+            FoodVisit.id == visit_id, FoodVisit.food_place_id == place_id
+        )
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Food visit not found")
@@ -4183,10 +4257,10 @@ async def create_food_visit_comment(
         body=payload.body.strip(),
     )
     db.add(comment)
-    place = db.query(FoodPlace).filter(FoodPlace.id == place_id).first()
+    place = await db.get(FoodPlace, place_id)
     summary_target = place.name if place else "a food visit"
-    db.flush()
-    log_user_activity(
+    await db.flush()
+    await log_user_activity(
         db,
         user,
         action="create",
@@ -4195,8 +4269,8 @@ async def create_food_visit_comment(
         summary=f"commented on {summary_target}",
         details=[f'Comment: "{comment.body}"'],
     )
-    db.commit()
-    db.refresh(comment)
+    await db.commit()
+    await db.refresh(comment)
     return FoodVisitCommentOut(
         id=comment.id,
         body=comment.body,
@@ -4216,30 +4290,28 @@ async def delete_food_visit_comment(
     visit_id: int,
     comment_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    comment = (
-        db.query(FoodVisitComment)
-        .filter(
+    comment = await db.scalar(
+        select(FoodVisitComment).where(
             FoodVisitComment.id == comment_id,
             FoodVisitComment.visit_id == visit_id,
         )
-        .first()
     )
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    visit = (
-        db.query(FoodVisit)
-        .filter(FoodVisit.id == visit_id, FoodVisit.food_place_id == place_id)
-        .first()
+    visit = await db.scalar(
+        select(FoodVisit).where(
+            FoodVisit.id == visit_id, FoodVisit.food_place_id == place_id
+        )
     )
     if not visit:
         raise HTTPException(status_code=404, detail="Food visit not found")
     if comment.user_id != user.id:
         raise HTTPException(status_code=403, detail="Not allowed")
-    place = db.query(FoodPlace).filter(FoodPlace.id == place_id).first()
+    place = await db.get(FoodPlace, place_id)
     summary_target = place.name if place else "a food visit"
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -4247,22 +4319,23 @@ async def delete_food_visit_comment(
         entity_id=comment.id,
         summary=f"deleted a comment on {summary_target}",
     )
-    db.delete(comment)
-    db.commit()
+    await db.delete(comment)
+    await db.commit()
     return ProfileSetResponse(status="deleted")
 
 
 @app.get("/trips", response_model=TripListResponse)
 async def list_trips(
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     entries = (
-        db.query(CheckIn)
-        .filter(CheckIn.user_id == user.id)
-        .order_by(CheckIn.visited_at.asc())
-        .all()
-    )
+        await db.scalars(
+            select(CheckIn)
+            .where(CheckIn.user_id == user.id)
+            .order_by(CheckIn.visited_at.asc())
+        )
+    ).all()
     trips = build_trips(entries)
     return TripListResponse(trips=trips)
 
@@ -4271,14 +4344,15 @@ async def list_trips(
 async def get_trip(
     trip_id: str,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     entries = (
-        db.query(CheckIn)
-        .filter(CheckIn.user_id == user.id)
-        .order_by(CheckIn.visited_at.asc())
-        .all()
-    )
+        await db.scalars(
+            select(CheckIn)
+            .where(CheckIn.user_id == user.id)
+            .order_by(CheckIn.visited_at.asc())
+        )
+    ).all()
     trips = build_trips(entries)
     for trip in trips:
         if trip.id == trip_id:
@@ -4291,15 +4365,14 @@ async def update_check_in(
     check_in_id: int,
     payload: CheckInUpdate,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    check_in = (
-        db.query(CheckIn)
-        .filter(CheckIn.id == check_in_id, CheckIn.user_id == user.id)
-        .first()
+    check_in = await db.scalar(
+        select(CheckIn).where(CheckIn.id == check_in_id, CheckIn.user_id == user.id)
     )
     if not check_in:
         raise HTTPException(status_code=404, detail="Check in not found")
+    previous_point = check_in_point(check_in)
     if payload.location_name is not None:
         check_in.location_name = payload.location_name
     if payload.location_label is not None:
@@ -4311,7 +4384,10 @@ async def update_check_in(
     if payload.visited_at is not None:
         check_in.visited_at = parse_iso_datetime(payload.visited_at)
     db.add(check_in)
-    log_user_activity(
+    await refresh_check_in_rollups(
+        db, user.id, [previous_point, check_in_point(check_in)]
+    )
+    await log_user_activity(
         db,
         user,
         action="update",
@@ -4319,8 +4395,8 @@ async def update_check_in(
         entity_id=check_in.id,
         summary=f"Updated check in at {check_in.location_label}",
     )
-    db.commit()
-    db.refresh(check_in)
+    await db.commit()
+    await db.refresh(check_in)
     return CheckInOut(
         id=check_in.id,
         location_name=check_in.location_name,
@@ -4335,16 +4411,14 @@ async def update_check_in(
 async def delete_check_in(
     check_in_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    check_in = (
-        db.query(CheckIn)
-        .filter(CheckIn.id == check_in_id, CheckIn.user_id == user.id)
-        .first()
+    check_in = await db.scalar(
+        select(CheckIn).where(CheckIn.id == check_in_id, CheckIn.user_id == user.id)
     )
     if not check_in:
         raise HTTPException(status_code=404, detail="Check in not found")
-    log_user_activity(
+    await log_user_activity(
         db,
         user,
         action="delete",
@@ -4352,6 +4426,7 @@ async def delete_check_in(
         entity_id=check_in.id,
         summary=f"Deleted check in at {check_in.location_label}",
     )
-    db.delete(check_in)
-    db.commit()
+    await db.delete(check_in)
+    await refresh_check_in_rollups(db, user.id, [check_in_point(check_in)])
+    await db.commit()
     return ProfileSetResponse(status="deleted")
@@ -0,0 +1,207 @@
+"""Schema migrations.
+
+``Base.metadata.create_all`` creates missing tables but never alters existing
+ones, so changes to a deployed database go here. Each migration runs once, in
+order, inside its own transaction and is recorded in ``schema_migrations``.
+Migrations must be safe on a fresh database where create_all already built the
+current schema.
+
+    python -m app.migrations            apply pending migrations
+    python -m app.migrations --status   list applied and pending migrations
+"""
+import argparse
+import json
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from .cache import CACHE_SCOPES
+from .check_in_rollups import rebuild_check_in_rollups
+from .food_stats import rebuild_food_place_stats
+from .models import (
+    CacheVersion,
+    CheckInLocationCount,
+    CheckInMonthCount,
+    FoodPlaceVisitStats,
+    FoodVisitDish,
+    cuisine_category,
+)
+
+PERFORMANCE_INDEXES = [
+    ("ix_food_visits_food_place_id_visited_at", "food_visits", "food_place_id, visited_at"),
+    ("ix_food_visits_visited_at_id", "food_visits", "visited_at, id"),
+    ("ix_activity_visits_activity_id_visited_at", "activity_visits", "activity_id, visited_at"),
+    ("ix_check_ins_user_id_visited_at", "check_ins", "user_id, visited_at"),
+    ("ix_food_places_open", "food_places", "open"),
+    ("ix_journal_entries_is_public_entry_date", "journal_entries", "is_public, entry_date"),
+    ("ix_user_activity_user_id_created_at_id", "user_activity", "user_id, created_at, id"),
+]
+
+
+TOKEN_SWEEP_INDEXES = [
+    ("ix_otp_tokens_expires_at", "otp_tokens", "expires_at"),
+    ("ix_magic_link_tokens_expires_at", "magic_link_tokens", "expires_at"),
+    ("ix_refresh_tokens_expires_at", "refresh_tokens", "expires_at"),
+    ("ix_refresh_tokens_revoked_at", "refresh_tokens", "revoked_at"),
+]
+
+CHECK_IN_LABEL_INDEXES = [
+    ("ix_check_ins_user_id_label", "check_ins", "user_id, coalesce(location_label, location_name)"),
+]
+
+
+def create_indexes(conn: Connection, indexes: list[tuple[str, str, str]]) -> None:
+    for name, table, columns in indexes:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def create_performance_indexes(conn: Connection) -> None:
+    create_indexes(conn, PERFORMANCE_INDEXES)
+
+
+def create_token_sweep_indexes(conn: Connection) -> None:
+    create_indexes(conn, TOKEN_SWEEP_INDEXES)
+
+
+def create_check_in_label_index(conn: Connection) -> None:
+    create_indexes(conn, CHECK_IN_LABEL_INDEXES)
+
+
+def create_food_place_stats(conn: Connection) -> None:
+    FoodPlaceVisitStats.__table__.create(conn, checkfirst=True)
+    rebuild_food_place_stats(conn)
+
+
+def seed_cache_versions(conn: Connection) -> None:
+    CacheVersion.__table__.create(conn, checkfirst=True)
+    existing = set(conn.execute(text("SELECT key FROM cache_versions")).scalars())
+    for scope in CACHE_SCOPES:
+        if scope not in existing:
+            conn.execute(CacheVersion.__table__.insert().values(key=scope, version=0))
+
+
+def create_check_in_rollups(conn: Connection) -> None:
+    for model in (CheckInMonthCount, CheckInLocationCount):
+        model.__table__.create(conn, checkfirst=True)
+    rebuild_check_in_rollups(conn)
+
+
+def add_cuisine_category(conn: Connection) -> None:
+    columns = {column["name"] for column in inspect(conn).get_columns("food_places")}
+    if "cuisine_category" not in columns:
+        conn.execute(text("ALTER TABLE food_places ADD COLUMN cuisine_category VARCHAR(128)"))
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_food_places_cuisine_category "
+            "ON food_places (cuisine_category)"
+        )
+    )
+    rows = conn.execute(text("SELECT id, cuisine FROM food_places WHERE cuisine IS NOT NULL"))
+    for place_id, cuisine in rows.all():
+        conn.execute(
+            text("UPDATE food_places SET cuisine_category = :category WHERE id = :id"),
+            {"category": cuisine_category(cuisine), "id": place_id},
+        )
+
+
+def legacy_dishes(value: str | None) -> list[dict]:
+    try:
+        raw = json.loads(value) if value else []
+    except (TypeError, json.JSONDecodeError):
+        return []
+    dishes = []
+    for item in raw if isinstance(raw, list) else []:
+        if not isinstance(item, dict):
+            continue
+        name = str(item.get("name", "")).strip()
+        if not name:
+            continue
+        try:
+            rating = float(item["rating"]) if item.get("rating") is not None else None
+        except (TypeError, ValueError):
+            rating = None
+        dishes.append({"name": name[:255], "rating": rating})
+    return dishes
+
+
+def move_dishes_to_table(conn: Connection) -> None:
+    FoodVisitDish.__table__.create(conn, checkfirst=True)
+    rows = conn.execute(
+        text(
+            "SELECT id, dishes FROM food_visits WHERE dishes IS NOT NULL AND NOT EXISTS "
+            "(SELECT 1 FROM food_visit_dishes WHERE visit_id = food_visits.id)"
+        )
+    )
+    values = [
+        {"visit_id": visit_id, "position": position, **dish}
+        for visit_id, dishes in rows.all()
+        for position, dish in enumerate(legacy_dishes(dishes))
+    ]
+    if values:
+        conn.execute(FoodVisitDish.__table__.insert(), values)
+
+
+MIGRATIONS: list[tuple[str, Callable[[Connection], None]]] = [
+    ("0001_performance_indexes", create_performance_indexes),
+    ("0002_food_place_stats", create_food_place_stats),
+    ("0003_cache_versions", seed_cache_versions),
+    ("0004_check_in_rollups", create_check_in_rollups),
+    ("0005_cuisine_category", add_cuisine_category),
+    ("0006_food_visit_dishes", move_dishes_to_table),
+    ("0007_token_sweep_indexes", create_token_sweep_indexes),
+    ("0008_check_in_label_index", create_check_in_label_index),
+]
+
+
+def ensure_migrations_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "id VARCHAR(128) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+            )
+        )
+
+
+def applied_migrations(engine: Engine) -> set[str]:
+    ensure_migrations_table(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT id FROM schema_migrations")).scalars())
+
+
+def upgrade(engine: Engine) -> list[str]:
+    applied = applied_migrations(engine)
+    ran = []
+    for migration_id, migrate in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (id, applied_at) VALUES (:id, :at)"),
+                {"id": migration_id, "at": datetime.utcnow()},
+            )
+        ran.append(migration_id)
+    return ran
+
+
+def main() -> None:
+    from .db import Base, engine
+
+    parser = argparse.ArgumentParser(description="Apply nut places schema migrations.")
+    parser.add_argument("--status", action="store_true", help="only list migrations")
+    args = parser.parse_args()
+    if args.status:
+        applied = applied_migrations(engine)
+        for migration_id, _ in MIGRATIONS:
+            print(f"{'applied' if migration_id in applied else 'pending'}  {migration_id}")
+        return
+    Base.metadata.create_all(bind=engine)
+    ran = upgrade(engine)
+    print("\n".join(f"applied  {migration_id}" for migration_id in ran) or "up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 from datetime import datetime
-from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, Text, Float
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, Text, Float, Index, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from .db import Base
 
 
+def cuisine_category(cuisine: str | None) -> str | None:
+    """Top-level category of a "Category • Subcategory" cuisine string."""
+    if not cuisine:
+        return None
+    return cuisine.split(" • ")[0].strip() or None
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -71,7 +78,7 @@ class OtpToken(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     telegram_uid: Mapped[str] = mapped_column(String(32), index=True)
     pin: Mapped[str] = mapped_column(String(8))
-    expires_at: Mapped[datetime] = mapped_column(DateTime)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
     used: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -82,7 +89,7 @@ class MagicLinkToken(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     telegram_uid: Mapped[str] = mapped_column(String(32), index=True)
     token: Mapped[str] = mapped_column(String(128), unique=True, index=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
     used: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -110,13 +117,16 @@ class RefreshToken(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
     token: Mapped[str] = mapped_column(String(128), unique=True, index=True)
     device_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime)
-    revoked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
+    revoked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
 
 class CheckIn(Base):
     __tablename__ = "check_ins"
+    __table_args__ = (
+        Index("ix_check_ins_user_id_visited_at", "user_id", "visited_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -130,8 +140,46 @@ class CheckIn(Base):
     user: Mapped[User] = relationship(back_populates="check_ins")
 
 
+# Serves the per-label recount in check_in_rollups.
+Index(
+    "ix_check_ins_user_id_label",
+    CheckIn.user_id,
+    func.coalesce(CheckIn.location_label, CheckIn.location_name),
+)
+
+
+class CheckInMonthCount(Base):
+    """Check-ins per user and calendar month, maintained on check-in writes."""
+
+    __tablename__ = "check_in_month_counts"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class CheckInLocationCount(Base):
+    """Check-ins per user and location label within a year; year 0 holds all-time totals."""
+
+    __tablename__ = "check_in_location_counts"
+    __table_args__ = (
+        Index("ix_check_in_location_counts_user_id_year_count", "user_id", "year", "count"),
+    )
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), primary_key=True)
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    label: Mapped[str] = mapped_column(String(255), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    latitude: Mapped[float | None] = mapped_column(nullable=True)
+    longitude: Mapped[float | None] = mapped_column(nullable=True)
+
+
 class FoodPlace(Base):
     __tablename__ = "food_places"
+    __table_args__ = (
+        Index("ix_food_places_open", "open"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int | None] = mapped_column(
@@ -143,6 +191,9 @@ class FoodPlace(Base):
     latitude: Mapped[float] = mapped_column()
     longitude: Mapped[float] = mapped_column()
     cuisine: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    cuisine_category: Mapped[str | None] = mapped_column(
+        String(128), index=True, nullable=True
+    )
     open: Mapped[bool] = mapped_column(Boolean, default=True)
     header_url: Mapped[str | None] = mapped_column(Text, nullable=True)
     comments: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -163,10 +214,41 @@ class FoodPlace(Base):
     visits: Mapped[list["FoodVisit"]] = relationship(
         back_populates="food_place", cascade="all, delete-orphan"
     )
+    stats: Mapped["FoodPlaceVisitStats | None"] = relationship(
+        back_populates="food_place", cascade="all, delete-orphan", uselist=False
+    )
+
+    @validates("cuisine")
+    def sync_cuisine_category(self, _key: str, cuisine: str | None) -> str | None:
+        self.cuisine_category = cuisine_category(cuisine)
+        return cuisine
+
+
+class FoodPlaceVisitStats(Base):
+    """Visit aggregates for one food place, refreshed whenever its visits change."""
+
+    __tablename__ = "food_place_stats"
+
+    food_place_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("food_places.id", ondelete="CASCADE"), primary_key=True
+    )
+    visit_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    rating_sum: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    rating_sq_sum: Mapped[float] = mapped_column(Float, default=0, nullable=False)
+    last_visit_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    any_again_no: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    any_again_yes: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+    food_place: Mapped[FoodPlace] = relationship(back_populates="stats")
 
 
 class FoodVisit(Base):
     __tablename__ = "food_visits"
+    __table_args__ = (
+        Index("ix_food_visits_food_place_id_visited_at", "food_place_id", "visited_at"),
+        Index("ix_food_visits_visited_at_id", "visited_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -178,6 +260,7 @@ class FoodVisit(Base):
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     again: Mapped[str | None] = mapped_column(String(16), nullable=True)
     photo_url: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Legacy JSON copy of the dishes; food_visit_dishes is the source of truth.
     dishes: Mapped[str | None] = mapped_column(Text, nullable=True)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, nullable=False
@@ -197,6 +280,28 @@ class FoodVisit(Base):
     comments: Mapped[list["FoodVisitComment"]] = relationship(
         back_populates="visit", cascade="all, delete-orphan"
     )
+    dish_items: Mapped[list["FoodVisitDish"]] = relationship(
+        back_populates="visit",
+        cascade="all, delete-orphan",
+        order_by="FoodVisitDish.position",
+    )
+
+
+class FoodVisitDish(Base):
+    __tablename__ = "food_visit_dishes"
+    __table_args__ = (
+        Index("ix_food_visit_dishes_visit_id_position", "visit_id", "position"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    visit_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("food_visits.id", ondelete="CASCADE")
+    )
+    position: Mapped[int] = mapped_column(Integer)
+    name: Mapped[str] = mapped_column(String(255))
+    rating: Mapped[float | None] = mapped_column(Float, nullable=True)
+
+    visit: Mapped[FoodVisit] = relationship(back_populates="dish_items")
 
 
 class FoodVisitComment(Base):
@@ -252,6 +357,9 @@ class Activity(Base):
 
 class ActivityVisit(Base):
     __tablename__ = "activity_visits"
+    __table_args__ = (
+        Index("ix_activity_visits_activity_id_visited_at", "activity_id", "visited_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -301,6 +409,9 @@ class ActivityVisitComment(Base):
 
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index("ix_journal_entries_is_public_entry_date", "is_public", "entry_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -363,6 +474,9 @@ class TierlistComment(Base):
 
 class UserActivity(Base):
     __tablename__ = "user_activity"
+    __table_args__ = (
+        Index("ix_user_activity_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
@@ -373,3 +487,10 @@ class UserActivity(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     user: Mapped[User] = relationship(back_populates="activity_log")
+
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
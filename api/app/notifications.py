@@ -0,0 +1,181 @@
+import asyncio
+import json
+import os
+
+import httpx
+
+from .bot_client import BOT_SERVICE_URL, post_to_bot
+
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "200"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "10"))
+NOTIFY_BATCH_WINDOW_SECONDS = float(os.getenv("NOTIFY_BATCH_WINDOW_SECONDS", "0.5"))
+NOTIFY_DRAIN_SECONDS = float(os.getenv("NOTIFY_DRAIN_SECONDS", "5"))
+# drop_oldest | drop_new | spill
+NOTIFY_OVERFLOW_POLICY = os.getenv("NOTIFY_OVERFLOW_POLICY", "drop_oldest")
+NOTIFY_SPILL_PATH = os.getenv("NOTIFY_SPILL_PATH", "/data/notify_spill.jsonl")
+# A failed batch is resent this many times (with doubling delays) before it is spilled.
+NOTIFY_RETRY_ATTEMPTS = int(os.getenv("NOTIFY_RETRY_ATTEMPTS", "3"))
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "1"))
+# How often an idle worker picks up spilled events again.
+NOTIFY_RESTORE_INTERVAL_SECONDS = float(os.getenv("NOTIFY_RESTORE_INTERVAL_SECONDS", "60"))
+
+
+class ActivityNotifier:
+    """Single background worker that forwards activity messages to the bot in batches."""
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[dict] | None = None
+        self.task: asyncio.Task | None = None
+        self.metrics = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "restored": 0,
+            "batches": 0,
+            "max_depth": 0,
+        }
+
+    def start(self) -> None:
+        if self.task is not None:
+            return
+        self.queue = asyncio.Queue(maxsize=max(NOTIFY_QUEUE_SIZE, 1))
+        self.restore_spilled()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=NOTIFY_DRAIN_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        leftover = []
+        while not self.queue.empty():
+            leftover.append(self.queue.get_nowait())
+        if leftover and NOTIFY_OVERFLOW_POLICY == "spill":
+            self.spill(leftover)
+        else:
+            self.metrics["dropped"] += len(leftover)
+
+    def enqueue(self, item: dict) -> None:
+        if not BOT_SERVICE_URL or self.queue is None:
+            return
+        if self.queue.full():
+            if NOTIFY_OVERFLOW_POLICY == "drop_new":
+                self.metrics["dropped"] += 1
+                return
+            if NOTIFY_OVERFLOW_POLICY == "spill":
+                self.spill([item])
+                return
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.metrics["dropped"] += 1
+        self.queue.put_nowait(item)
+        self.metrics["enqueued"] += 1
+        self.metrics["max_depth"] = max(self.metrics["max_depth"], self.queue.qsize())
+
+    def snapshot(self) -> dict:
+        return {
+            **self.metrics,
+            "depth": self.queue.qsize() if self.queue else 0,
+            "capacity": NOTIFY_QUEUE_SIZE,
+            "overflow_policy": NOTIFY_OVERFLOW_POLICY,
+        }
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    self.queue.get(), NOTIFY_RESTORE_INTERVAL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                self.restore_spilled()
+                continue
+            batch = [item]
+            deadline = loop.time() + NOTIFY_BATCH_WINDOW_SECONDS
+            while len(batch) < NOTIFY_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                delivered = await self.deliver(batch)
+            except asyncio.CancelledError:
+                # Stopped mid-delivery; the idempotency keys make a resend safe.
+                self.spill(batch)
+                raise
+            self.metrics["batches"] += 1
+            if delivered:
+                self.metrics["sent"] += len(batch)
+            else:
+                self.metrics["failed"] += len(batch)
+                self.spill(batch)
+            for _ in batch:
+                self.queue.task_done()
+            # Spilled events come back after a delivery succeeds or the worker idles.
+            if delivered and self.queue.empty():
+                self.restore_spilled()
+
+    async def deliver(self, batch: list[dict]) -> bool:
+        for attempt in range(max(NOTIFY_RETRY_ATTEMPTS, 0) + 1):
+            if attempt:
+                self.metrics["retried"] += len(batch)
+                await asyncio.sleep(NOTIFY_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+            if await send_batch(batch):
+                return True
+        return False
+
+    def spill(self, items: list[dict]) -> None:
+        try:
+            os.makedirs(os.path.dirname(NOTIFY_SPILL_PATH), exist_ok=True)
+            with open(NOTIFY_SPILL_PATH, "a", encoding="utf-8") as handle:
+                for item in items:
+                    handle.write(json.dumps(item) + "\n")
+            self.metrics["spilled"] += len(items)
+        except OSError:
+            self.metrics["dropped"] += len(items)
+
+    def restore_spilled(self) -> None:
+        if not os.path.exists(NOTIFY_SPILL_PATH):
+            return
+        try:
+            with open(NOTIFY_SPILL_PATH, "r", encoding="utf-8") as handle:
+                lines = [line for line in handle.read().splitlines() if line.strip()]
+        except OSError:
+            return
+        room = self.queue.maxsize - self.queue.qsize()
+        for line in lines[:room]:
+            try:
+                self.queue.put_nowait(json.loads(line))
+                self.metrics["restored"] += 1
+            except json.JSONDecodeError:
+                self.metrics["dropped"] += 1
+        rest = lines[room:]
+        with open(NOTIFY_SPILL_PATH, "w", encoding="utf-8") as handle:
+            handle.write("".join(f"{line}\n" for line in rest))
+
+
+async def send_batch(batch: list[dict]) -> bool:
+    try:
+        response = await post_to_bot(
+            "/send-activity-batch", {"items": batch}, timeout=5 + len(batch)
+        )
+    except httpx.HTTPError:
+        return False
+    return response.is_success
+
+
+notifier = ActivityNotifier()
@@ -0,0 +1,154 @@
+"""Keyset (cursor) pagination shared by the list endpoints.
+
+A list is ordered by ``SortKey``s ending in a unique id. ``next_cursor`` is an
+opaque token holding the last row's key values; passing it back as ``cursor``
+continues after that row with a WHERE on the keys instead of an OFFSET, so
+deep pages stay cheap and rows inserted meanwhile don't shift the page.
+``page`` keeps working for older clients; both modes return ``next_cursor``.
+
+The total comes back in the same statement as the page, as an uncorrelated
+count subquery the database runs once. A ``COUNT(*) OVER()`` column would
+make SQLite materialise and sort every matching row before the LIMIT (and
+only see rows after a cursor). ``include_total=False`` skips counting.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Select, and_, false, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass
+class Page:
+    items: list
+    total: int | None
+    next_cursor: str | None
+
+
+@dataclass(frozen=True)
+class SortKey:
+    expression: Any
+    descending: bool = False
+    # For nullable columns: NULLs sort after every value in either direction.
+    nulls_last: bool = False
+
+    def order_by(self):
+        order = self.expression.desc() if self.descending else self.expression.asc()
+        return order.nulls_last() if self.nulls_last else order
+
+    def after(self, value):
+        if self.nulls_last and value is None:
+            # Only the tie-breaking keys can move past a NULL.
+            return false()
+        condition = self.expression < value if self.descending else self.expression > value
+        return or_(condition, self.expression.is_(None)) if self.nulls_last else condition
+
+
+def encode_cursor(values: Sequence) -> str:
+    payload = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_value(key: SortKey, value):
+    """Check a cursor value against its key's column type before it reaches a bind."""
+    if value is None:
+        return None
+    if isinstance(key.expression.type, DateTime):
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.fromisoformat(value)
+    python_type = key.expression.type.python_type
+    if isinstance(value, bool):
+        raise ValueError
+    if python_type is float and isinstance(value, (int, float)):
+        return float(value)
+    if python_type in (int, str) and isinstance(value, python_type):
+        return value
+    raise ValueError
+
+
+def decode_cursor(cursor: str, keys: Sequence[SortKey]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [decode_value(key, value) for key, value in zip(keys, values)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(
+    query: Select,
+    keys: Sequence[SortKey],
+    page: int,
+    page_size: int,
+    cursor: str | None,
+) -> Select:
+    """Order, position and limit ``query``; fetches one extra row to detect a next page."""
+    query = query.order_by(*(key.order_by() for key in keys))
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.where(
+            or_(
+                *(
+                    and_(
+                        *(keys[j].expression == values[j] for j in range(i)),
+                        keys[i].after(values[i]),
+                    )
+                    for i in range(len(keys))
+                )
+            )
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    return query.limit(page_size + 1)
+
+
+async def count_rows(db: AsyncSession, stmt) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    )
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query: Select,
+    keys: Sequence[SortKey],
+    key_values: Callable[[Any], Sequence],
+    page: int,
+    page_size: int,
+    cursor: str | None = None,
+    include_total: bool = True,
+) -> Page:
+    """Run one page of ``query``; items are rows (or the entity for single-entity selects)."""
+    stmt = query
+    if include_total:
+        total_column = (
+            select(func.count()).select_from(query.order_by(None).subquery()).scalar_subquery()
+        )
+        stmt = query.add_columns(total_column.label("total_count"))
+    rows = (await db.execute(keyset_page(stmt, keys, page, page_size, cursor))).all()
+    total = None
+    if include_total:
+        if rows:
+            total = rows[0][-1]
+        elif cursor or page > 1:
+            # Past the end there is no row to carry the count.
+            total = await count_rows(db, query)
+        else:
+            total = 0
+        rows = [row[:-1] for row in rows]
+    items = [row[0] if len(row) == 1 else tuple(row) for row in rows]
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(key_values(items[-1]))
+    return Page(items=items, total=total, next_cursor=next_cursor)
@@ -181,9 +181,10 @@ class CheckInStats(BaseModel):
 
 class CheckInListResponse(BaseModel):
     items: list[CheckInOut]
-    total: int
+    total: int | None
     stats: CheckInStats
     years: list[str]
+    next_cursor: str | None = None
 
 
 class FoodPlaceCreate(BaseModel):
@@ -250,8 +251,9 @@ class FoodPlaceStats(BaseModel):
 
 class FoodPlaceListResponse(BaseModel):
     items: list[FoodPlaceOut]
-    total: int
+    total: int | None
     stats: FoodPlaceStats
+    next_cursor: str | None = None
 
 
 class FoodCuisineStat(BaseModel):
@@ -304,8 +306,9 @@ class FoodVisitOut(BaseModel):
 
 class FoodVisitListResponse(BaseModel):
     items: list[FoodVisitOut]
-    total: int
+    total: int | None
     last_visit_at: str | None = None
+    next_cursor: str | None = None
 
 
 class FoodVisitSearchItem(BaseModel):
@@ -389,17 +392,27 @@ class ActivityTop(BaseModel):
     bucket: ActivityOut | None = None
 
 
+class ActivityStatsGroup(BaseModel):
+    label: str | None = None
+    total: int
+    done_all: int
+    done_year: int
+
+
 class ActivityStats(BaseModel):
     total: int
     done_all: int
     done_year: int
     top_all_time: ActivityOut | None = None
     top_year: ActivityOut | None = None
+    by_type: list[ActivityStatsGroup] = []
+    by_category: list[ActivityStatsGroup] = []
 
 
 class ActivityListResponse(BaseModel):
     items: list[ActivityOut]
-    total: int
+    total: int | None
+    next_cursor: str | None = None
 
 
 class ActivityRollRequest(BaseModel):
@@ -449,8 +462,9 @@ class ActivityVisitOut(BaseModel):
 
 class ActivityVisitListResponse(BaseModel):
     items: list[ActivityVisitOut]
-    total: int
+    total: int | None
     last_visit_at: str | None = None
+    next_cursor: str | None = None
 
 
 class ActivityVisitSearchItem(BaseModel):
@@ -584,7 +598,8 @@ class JournalEntryOut(BaseModel):
 
 class JournalEntryListResponse(BaseModel):
     items: list[JournalEntryOut]
-    total: int
+    total: int | None
+    next_cursor: str | None = None
 
 
 class TierlistTier(BaseModel):
@@ -625,7 +640,8 @@ class TierlistOut(BaseModel):
 
 class TierlistListResponse(BaseModel):
     items: list[TierlistOut]
-    total: int
+    total: int | None
+    next_cursor: str | None = None
 
 
 class UserActivityOut(BaseModel):
@@ -0,0 +1,116 @@
+"""Purges spent auth tokens so the tables the auth queries hit stay small.
+
+Expired OTP and magic-link tokens, used ones, and expired or revoked refresh
+tokens are deleted once they are older than ``TOKEN_SWEEP_GRACE_SECONDS``, in
+batches of ``TOKEN_SWEEP_BATCH_SIZE`` rows with one transaction per batch.
+The API runs a sweep every ``TOKEN_SWEEP_INTERVAL_SECONDS`` (0 disables it).
+
+    python -m app.token_sweeper    run one sweep and print rows removed
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from .db import async_engine
+from .models import MagicLinkToken, OtpToken, RefreshToken
+
+TOKEN_SWEEP_INTERVAL_SECONDS = float(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+TOKEN_SWEEP_BATCH_SIZE = int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", "500"))
+# Spent rows are kept this long first; the OTP resend cooldown reads the latest one.
+TOKEN_SWEEP_GRACE_SECONDS = int(os.getenv("TOKEN_SWEEP_GRACE_SECONDS", "3600"))
+
+
+def sweep_targets(cutoff: datetime) -> list:
+    """(model, condition) pairs; each condition is swept on its own so it can use its index."""
+    return [
+        (OtpToken, OtpToken.expires_at < cutoff),
+        (OtpToken, OtpToken.used.is_(True) & (OtpToken.created_at < cutoff)),
+        (MagicLinkToken, MagicLinkToken.expires_at < cutoff),
+        (MagicLinkToken, MagicLinkToken.used.is_(True) & (MagicLinkToken.created_at < cutoff)),
+        (RefreshToken, RefreshToken.expires_at < cutoff),
+        (RefreshToken, RefreshToken.revoked_at < cutoff),
+    ]
+
+
+async def sweep_expired_tokens(batch_size: int = TOKEN_SWEEP_BATCH_SIZE) -> dict[str, int]:
+    cutoff = datetime.utcnow() - timedelta(seconds=TOKEN_SWEEP_GRACE_SECONDS)
+    batch_size = max(batch_size, 1)
+    removed = {}
+    for model, condition in sweep_targets(cutoff):
+        table = model.__tablename__
+        removed.setdefault(table, 0)
+        while True:
+            batch = select(model.id).where(condition).limit(batch_size)
+            async with async_engine.begin() as conn:
+                result = await conn.execute(
+                    delete(model).where(model.id.in_(batch.scalar_subquery()))
+                )
+            removed[table] += result.rowcount
+            if result.rowcount < batch_size:
+                break
+            # Let request handlers in between batches.
+            await asyncio.sleep(0)
+    return removed
+
+
+class TokenSweeper:
+    """Background task that runs ``sweep_expired_tokens`` on an interval."""
+
+    def __init__(self) -> None:
+        self.task: asyncio.Task | None = None
+        self.metrics = {"runs": 0, "failed": 0, "removed": {}, "last_run_at": None}
+
+    def start(self) -> None:
+        if self.task is not None or TOKEN_SWEEP_INTERVAL_SECONDS <= 0:
+            return
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def snapshot(self) -> dict:
+        return {**self.metrics, "interval_seconds": TOKEN_SWEEP_INTERVAL_SECONDS}
+
+    async def run(self) -> None:
+        while True:
+            await self.sweep()
+            await asyncio.sleep(TOKEN_SWEEP_INTERVAL_SECONDS)
+
+    async def sweep(self) -> None:
+        try:
+            removed = await sweep_expired_tokens()
+        except Exception:
+            self.metrics["failed"] += 1
+            return
+        self.metrics["runs"] += 1
+        self.metrics["last_run_at"] = datetime.utcnow().isoformat()
+        for table, count in removed.items():
+            self.metrics["removed"][table] = self.metrics["removed"].get(table, 0) + count
+
+
+token_sweeper = TokenSweeper()
+
+
+def main() -> None:
+    async def sweep_once() -> dict[str, int]:
+        try:
+            return await sweep_expired_tokens()
+        finally:
+            await async_engine.dispose()
+
+    removed = asyncio.run(sweep_once())
+    for table, count in removed.items():
+        print(f"{table}: removed {count}")
+
+
+if __name__ == "__main__":
+    main()
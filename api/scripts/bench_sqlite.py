@@ -0,0 +1,153 @@
+"""Concurrent read/write benchmark for the SQLite connection profile.
+
+Runs the same mixed workload (visit inserts alongside per-place rating
+aggregates) against a fresh database file twice: once with SQLite's defaults
+and once with the pragmas from ``app.db.SQLITE_PRAGMAS``.
+
+    cd api && python scripts/bench_sqlite.py --writers 8 --readers 8 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db import Base, SQLITE_PRAGMAS, apply_sqlite_pragmas  # noqa: E402
+from app.models import FoodPlace, FoodVisit, User  # noqa: E402
+
+
+async def run_profile(name: str, pragmas: dict | None, args) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": args.driver_timeout},
+        pool_size=args.writers + args.readers,
+    )
+    if pragmas is not None:
+        event.listen(
+            engine.sync_engine,
+            "connect",
+            lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection, pragmas),
+        )
+    sessions = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessions() as db:
+        user = User(telegram_uid="bench")
+        db.add(user)
+        await db.flush()
+        places = [
+            FoodPlace(
+                name=f"Place {i}",
+                location_label="Bench",
+                latitude=1.3,
+                longitude=103.8,
+                user_id=user.id,
+                updated_by_user_id=user.id,
+            )
+            for i in range(args.places)
+        ]
+        db.add_all(places)
+        await db.commit()
+        user_id = user.id
+        place_ids = [place.id for place in places]
+
+    stats = {"writes": 0, "reads": 0, "locked": 0, "write_latency": [], "read_latency": []}
+    deadline = time.monotonic() + args.seconds
+
+    async def writer(n: int) -> None:
+        i = 0
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                async with sessions() as db:
+                    db.add(
+                        FoodVisit(
+                            food_place_id=place_ids[(n + i) % len(place_ids)],
+                            user_id=user_id,
+                            updated_by_user_id=user_id,
+                            rating=(i % 5) + 1,
+                            visited_at=datetime.utcnow(),
+                        )
+                    )
+                    await db.commit()
+                stats["writes"] += 1
+                stats["write_latency"].append(time.monotonic() - started)
+            except OperationalError:
+                stats["locked"] += 1
+            i += 1
+
+    async def reader(n: int) -> None:
+        i = 0
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                async with sessions() as db:
+                    await db.execute(
+                        select(
+                            FoodVisit.food_place_id,
+                            func.avg(FoodVisit.rating),
+                            func.count(FoodVisit.id),
+                        ).group_by(FoodVisit.food_place_id)
+                    )
+                stats["reads"] += 1
+                stats["read_latency"].append(time.monotonic() - started)
+            except OperationalError:
+                stats["locked"] += 1
+            i += 1
+
+    await asyncio.gather(
+        *(writer(n) for n in range(args.writers)),
+        *(reader(n) for n in range(args.readers)),
+    )
+    await engine.dispose()
+    return {"name": name, **stats}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+def report(result: dict, seconds: float) -> None:
+    print(
+        f"{result['name']:<10} "
+        f"writes/s={result['writes'] / seconds:8.1f}  "
+        f"reads/s={result['reads'] / seconds:8.1f}  "
+        f"write p50/p99={percentile(result['write_latency'], 0.5):6.1f}/"
+        f"{percentile(result['write_latency'], 0.99):6.1f}ms  "
+        f"read p50/p99={percentile(result['read_latency'], 0.5):6.1f}/"
+        f"{percentile(result['read_latency'], 0.99):6.1f}ms  "
+        f"locked={result['locked']}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--places", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument(
+        "--driver-timeout",
+        type=float,
+        default=5.0,
+        help="sqlite3 driver busy wait (its default is 5s); the tuned run overrides it via busy_timeout",
+    )
+    args = parser.parse_args()
+    for name, pragmas in (("defaults", None), ("tuned", SQLITE_PRAGMAS)):
+        report(await run_profile(name, pragmas, args), args.seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""The 0001 index pack is what the hot queries actually use on SQLite."""
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.cache import stats_cache
+from app.db import Base, is_sqlite
+from app.migrations import PERFORMANCE_INDEXES, upgrade
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('migrations')}/plans.db")
+    Base.metadata.create_all(bind=engine)
+    # create_all already builds the model indexes; drop the pack so it is the
+    # migration that puts them back, as on a database predating it.
+    with engine.begin() as conn:
+        for name, _, _ in PERFORMANCE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def query_plan(engine, statement: str, parameters) -> str:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_migration_recreates_index_pack(engine):
+    with engine.connect() as conn:
+        names = set(
+            conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars()
+        )
+    assert {name for name, _, _ in PERFORMANCE_INDEXES} <= names
+
+
+@pytest.fixture(scope="module")
+def seeded(client, login):
+    headers = login("400001")
+    place_id = client.post(
+        "/food-places",
+        json={"name": "Plan Place", "location_label": "Here", "latitude": 1.0, "longitude": 2.0},
+        headers=headers,
+    ).json()["id"]
+    client.post(f"/food-places/{place_id}/visits", json={"rating": 4}, headers=headers)
+    activity_id = client.post(
+        "/activities", json={"activity_type": "bucket", "name": "Plan Activity"}, headers=headers
+    ).json()["id"]
+    client.post(
+        f"/activities/{activity_id}/visits",
+        json={"visited_at": "2025-01-01T00:00:00"},
+        headers=headers,
+    )
+    client.post(
+        "/check-ins",
+        json={"location_label": "Here", "latitude": 1.0, "longitude": 2.0, "visited_at": "2025-03-01T00:00:00"},
+        headers=headers,
+    )
+    client.post(
+        "/journals",
+        json={"title": "Plan Entry", "entry_date": "2025-01-01T00:00:00", "is_public": True},
+        headers=headers,
+    )
+    return {"place": place_id, "activity": activity_id}, headers
+
+
+# (endpoint, fragments picking its statements, index they must use, whether
+# that index also gives the ORDER BY). The statements are the ones the
+# endpoint sends, explained against the database the migration built.
+HOT_QUERIES = [
+    (
+        "/food-places/{place}/visits",
+        ("FROM food_visits", "total_count"),
+        "ix_food_visits_food_place_id_visited_at",
+        True,
+    ),
+    (
+        "/food-places/{place}/visits?include_total=false",
+        ("FROM food_visits", "LIMIT"),
+        "ix_food_visits_food_place_id_visited_at",
+        True,
+    ),
+    (
+        "/food-places",
+        ("food_visits.visited_at >=",),
+        "ix_food_visits_visited_at_id",
+        False,
+    ),
+    (
+        "/activities/{activity}/visits",
+        ("FROM activity_visits", "total_count"),
+        "ix_activity_visits_activity_id_visited_at",
+        True,
+    ),
+    (
+        "/check-ins?year=2025",
+        ("FROM check_ins", "LIMIT"),
+        "ix_check_ins_user_id_visited_at",
+        True,
+    ),
+    ("/food-places/featured", ("FROM food_places",), "ix_food_places_open", False),
+    (
+        "/journals",
+        ("FROM journal_entries", "total_count"),
+        "ix_journal_entries_is_public_entry_date",
+        False,
+    ),
+    (
+        "/me/activity",
+        ("FROM user_activity", "LIMIT"),
+        "ix_user_activity_user_id_created_at_id",
+        True,
+    ),
+]
+
+
+@pytest.mark.skipif(not is_sqlite, reason="SQLite query plans")
+@pytest.mark.parametrize("url, fragments, index, ordered", HOT_QUERIES)
+def test_hot_query_uses_index(engine, executed, seeded, url, fragments, index, ordered):
+    ids, headers = seeded
+    # The food dashboard stats are cached; make /food-places run them again.
+    stats_cache.entries.clear()
+    statements = [
+        (statement, parameters)
+        for statement, parameters in executed(url.format(**ids), headers)
+        if all(fragment in statement for fragment in fragments)
+    ]
+    assert statements
+    for statement, parameters in statements:
+        plan = query_plan(engine, statement, parameters)
+        assert index in plan
+        if ordered:
+            assert "USE TEMP B-TREE FOR ORDER BY" not in plan
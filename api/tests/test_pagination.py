@@ -0,0 +1,141 @@
+"""Cursor pages walk the whole list once, bad cursors are a 400, and the
+count that rides along with a page doesn't stop it walking its index."""
+import base64
+import json
+
+import pytest
+from sqlalchemy import update
+
+from app.db import engine, is_sqlite
+from app.models import FoodVisit
+
+
+def make_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.fixture(scope="module")
+def place(client, login):
+    headers = login("200001")
+    place_id = client.post(
+        "/food-places",
+        json={"name": "Cursor Place", "location_label": "Here", "latitude": 1.0, "longitude": 2.0},
+        headers=headers,
+    ).json()["id"]
+    undated = []
+    for day in (3, None, 1, None, 2, 3, None):
+        visit = client.post(
+            f"/food-places/{place_id}/visits",
+            json={"rating": 4, "visited_at": f"2025-01-0{day or 1}T00:00:00"},
+            headers=headers,
+        ).json()
+        if day is None:
+            undated.append(visit["id"])
+    # The API always stamps a date; older rows can still be undated.
+    with engine.begin() as conn:
+        conn.execute(update(FoodVisit).where(FoodVisit.id.in_(undated)).values(visited_at=None))
+    return place_id, headers
+
+
+@pytest.fixture(scope="module")
+def activity(client, place):
+    # Two of everything listed, so a one-row page always has a next cursor.
+    _, headers = place
+    client.post(
+        "/food-places",
+        json={"name": "Other Place", "location_label": "There", "latitude": 1.0, "longitude": 2.0},
+        headers=headers,
+    )
+    for i in range(2):
+        client.post("/tierlists", json={"title": f"Cursor Tierlist {i}"}, headers=headers)
+        client.post(
+            "/journals",
+            json={"title": f"Cursor Entry {i}", "entry_date": "2025-01-01T00:00:00", "is_public": True},
+            headers=headers,
+        )
+        activity_id = client.post(
+            "/activities", json={"activity_type": "bucket", "name": f"Cursor Activity {i}"}, headers=headers
+        ).json()["id"]
+    for day in (1, 2, 3):
+        client.post(
+            f"/activities/{activity_id}/visits",
+            json={"visited_at": f"2025-01-0{day}T00:00:00"},
+            headers=headers,
+        )
+    return activity_id
+
+
+def page_plan(executed, url: str, headers: dict) -> str:
+    """EXPLAIN QUERY PLAN of the page statement (the one carrying the total) behind ``url``."""
+    statements = [
+        (statement, parameters)
+        for statement, parameters in executed(url, headers)
+        if "total_count" in statement
+    ]
+    assert len(statements) == 1
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statements[0][0]}", statements[0][1]).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_food_visit_cursor_pages_put_undated_visits_last(client, place):
+    place_id, headers = place
+    url = f"/food-places/{place_id}/visits?page_size=2&include_total=false"
+    everything = client.get(f"/food-places/{place_id}/visits?page_size=50", headers=headers).json()
+    walked, cursor = [], None
+    while True:
+        body = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers).json()
+        walked.extend(body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert [item["id"] for item in walked] == [item["id"] for item in everything["items"]]
+    assert everything["total"] == 7
+    dates = [item["visited_at"] for item in walked]
+    assert dates[:4] == sorted(dates[:4], reverse=True)
+    assert dates[4:] == [None, None, None]
+
+
+@pytest.mark.parametrize(
+    "path, values",
+    [
+        ("/food-places", [{"a": 1}]),
+        ("/food-places", [True]),
+        ("/check-ins", ["2025-01-01T00:00:00", "1"]),
+        ("/check-ins", [1, 1]),
+        ("/tierlists", ["Title", 1.5]),
+        ("/tierlists", ["Title"]),
+    ],
+)
+def test_cursor_values_must_match_their_key_types(client, place, path, values):
+    _, headers = place
+    response = client.get(f"{path}?cursor={make_cursor(values)}", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.skipif(not is_sqlite, reason="SQLite query plans")
+@pytest.mark.parametrize(
+    "path, walks_index",
+    [
+        ("/food-places/{place}/visits", True),
+        ("/activities/{activity}/visits", True),
+        ("/food-places", True),
+        # No index serves these orders; they sort, but only once.
+        ("/journals", False),
+        ("/tierlists", False),
+        ("/activities", False),
+    ],
+)
+@pytest.mark.parametrize("with_cursor", [False, True])
+def test_page_total_does_not_materialise_the_list(
+    client, executed, place, activity, path, walks_index, with_cursor
+):
+    place_id, headers = place
+    url = path.format(place=place_id, activity=activity) + "?page_size=1"
+    if with_cursor:
+        url += "&cursor=" + client.get(url, headers=headers).json()["next_cursor"]
+    plan = page_plan(executed, url, headers)
+    assert "CO-ROUTINE" not in plan
+    if walks_index:
+        assert "TEMP B-TREE" not in plan
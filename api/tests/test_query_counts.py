@@ -0,0 +1,54 @@
+"""List endpoints must not issue a query per row (see the selectinload options)."""
+import pytest
+
+
+@pytest.fixture(scope="module")
+def authors(client, login):
+    # Several authors, each editing someone else's rows, so related users are
+    # not all sitting in the identity map already.
+    headers = [login(uid) for uid in ("100001", "100002", "100003", "100004")]
+    visitor = login("100005")
+    for i in range(12):
+        author, editor = headers[i % 4], headers[(i + 1) % 4]
+        tierlist = client.post("/tierlists", json={"title": f"Tierlist {i}"}, headers=author)
+        client.put(
+            f"/tierlists/{tierlist.json()['id']}",
+            json={"title": f"Tierlist {i}"},
+            headers=editor,
+        )
+        client.post(
+            "/journals",
+            json={"title": f"Entry {i}", "entry_date": "2025-01-01T00:00:00", "is_public": True},
+            headers=author,
+        )
+        activity = client.post(
+            "/activities", json={"activity_type": "bucket", "name": f"Activity {i}"}, headers=author
+        )
+        client.post(
+            f"/activities/{activity.json()['id']}/visits",
+            json={"visited_at": "2025-01-01T00:00:00"},
+            headers=visitor,
+        )
+        place = client.post(
+            "/food-places",
+            json={"name": f"Place {i}", "location_label": "Here", "latitude": 1.0, "longitude": 2.0},
+            headers=author,
+        )
+        client.post(f"/food-places/{place.json()['id']}/visits", json={"rating": 4}, headers=visitor)
+    return headers, visitor
+
+
+@pytest.mark.parametrize("path", ["/tierlists", "/journals", "/activities"])
+def test_list_query_count_does_not_grow_with_page_size(executed, authors, path):
+    headers, _ = authors
+    small = executed(f"{path}?page_size=2", headers[0])
+    large = executed(f"{path}?page_size=12", headers[0])
+    assert len(small) == len(large)
+
+
+def test_activity_feed_query_count_does_not_grow_with_entries(executed, authors):
+    # The visitor's feed holds food and activity visit entries only.
+    _, visitor = authors
+    small = executed("/me/activity?limit=2", visitor)
+    large = executed("/me/activity?limit=12", visitor)
+    assert len(small) == len(large)
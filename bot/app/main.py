@@ -1,25 +1,44 @@
+import asyncio
 import html
 import json
 import os
-import threading
-import time
+from contextlib import asynccontextmanager
+import secrets
 from typing import Optional
 from urllib.parse import urlparse, parse_qs
+from uuid import uuid4
 
-import requests
-from fastapi import FastAPI, HTTPException, Header
+import httpx
+from fastapi import FastAPI, HTTPException, Header, Request
 from pydantic import BaseModel
 
+from .outbox import OUTBOX_DB, ActivityOutbox
+from .scheduler import ExpiryScheduler
+from .sender import PRIORITY_LOGIN, SendScheduler
+from .telegram import TelegramClient, TelegramRetryAfter
+
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 GROUP_CHAT_ID = os.getenv("TELEGRAM_GROUP_CHAT_ID", "")
 API_BASE_URL = os.getenv("BOT_API_BASE_URL", "http://api:8000")
 BOT_API_KEY = os.getenv("BOT_API_KEY", "")
 OFFSET_FILE = "/data/offset.json"
-POLL_INTERVAL = 2
-
-TELEGRAM_API = f"https://api.telegram.org/bot{BOT_TOKEN}"
-
-app = FastAPI(title="nut places bot")
+MAGIC_LINK_FILE = "/data/magic_links.json"
+POLL_RETRY_SECONDS = 5
+# "polling" long-polls getUpdates; "webhook" receives updates on /telegram/webhook.
+UPDATE_MODE = os.getenv("BOT_UPDATE_MODE", "polling")
+WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+WEBHOOK_QUEUE_SIZE = int(os.getenv("TELEGRAM_WEBHOOK_QUEUE_SIZE", "100"))
+# On shutdown, queued webhook updates get this long to finish before the worker is cancelled.
+WEBHOOK_DRAIN_SECONDS = float(os.getenv("TELEGRAM_WEBHOOK_DRAIN_SECONDS", "5"))
+
+telegram = TelegramClient(BOT_TOKEN)
+outbound = SendScheduler()
+api_client = httpx.AsyncClient(
+    base_url=API_BASE_URL,
+    headers={"X-Bot-Token": BOT_API_KEY} if BOT_API_KEY else None,
+    timeout=10,
+)
 
 
 class OtpMessage(BaseModel):
@@ -41,6 +60,11 @@ class ActivityMessage(BaseModel):
     image_url: Optional[str] = None
     parse_mode: Optional[str] = None
     reply_markup: Optional[dict] = None
+    idempotency_key: Optional[str] = None
+
+
+class ActivityBatch(BaseModel):
+    items: list[ActivityMessage]
 
 
 def load_offset() -> Optional[int]:
@@ -60,100 +84,13 @@ def save_offset(offset: int) -> None:
         json.dump({"offset": offset}, handle)
 
 
-def send_message(
-    chat_id: str,
-    text: str,
-    parse_mode: str | None = None,
-    reply_markup: dict | None = None,
-) -> int | None:
-    payload = {"chat_id": chat_id, "text": text}
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    if reply_markup:
-        payload["reply_markup"] = reply_markup
-    response = requests.post(
-        f"{TELEGRAM_API}/sendMessage",
-        json=payload,
-        timeout=10,
-    )
-    try:
-        payload = response.json()
-    except ValueError:
-        payload = None
-    if response.status_code >= 400:
-        raise HTTPException(status_code=502, detail="Failed to send Telegram message")
-    if isinstance(payload, dict) and not payload.get("ok", False):
-        description = payload.get("description", "Telegram rejected the message")
-        raise HTTPException(status_code=502, detail=description)
-    if isinstance(payload, dict):
-        return payload.get("result", {}).get("message_id")
-    return None
-
-
-def send_photo(
-    chat_id: str,
-    text: str,
-    image_url: str,
-    parse_mode: str | None = None,
-    reply_markup: dict | None = None,
-) -> None:
-    payload = {"chat_id": chat_id, "photo": image_url, "caption": text}
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    if reply_markup:
-        payload["reply_markup"] = reply_markup
-    response = requests.post(
-        f"{TELEGRAM_API}/sendPhoto",
-        json=payload,
-        timeout=10,
-    )
-    try:
-        payload = response.json()
-    except ValueError:
-        payload = None
-    if response.status_code >= 400:
-        raise HTTPException(status_code=502, detail="Failed to send Telegram photo")
-    if isinstance(payload, dict) and not payload.get("ok", False):
-        description = payload.get("description", "Telegram rejected the photo")
-        raise HTTPException(status_code=502, detail=description)
-
-
-def edit_message(
-    chat_id: str,
-    message_id: int,
-    text: str,
-    parse_mode: str | None = None,
-    reply_markup: dict | None = None,
-) -> None:
-    payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
-    if parse_mode:
-        payload["parse_mode"] = parse_mode
-    if reply_markup is not None:
-        payload["reply_markup"] = reply_markup
-    response = requests.post(
-        f"{TELEGRAM_API}/editMessageText",
-        json=payload,
-        timeout=10,
-    )
+async def create_magic_link(telegram_uid: str) -> tuple[str, int] | None:
     try:
-        payload = response.json()
-    except ValueError:
-        payload = None
-    if response.status_code >= 400:
-        raise HTTPException(status_code=502, detail="Failed to edit Telegram message")
-    if isinstance(payload, dict) and not payload.get("ok", False):
-        description = payload.get("description", "Telegram rejected the edit")
-        raise HTTPException(status_code=502, detail=description)
-
-
-def create_magic_link(telegram_uid: str) -> tuple[str, int] | None:
-    headers = {"X-Bot-Token": BOT_API_KEY} if BOT_API_KEY else {}
-    response = requests.post(
-        f"{API_BASE_URL}/bot/create-magic-link",
-        json={"telegram_uid": telegram_uid},
-        headers=headers,
-        timeout=10,
-    )
+        response = await api_client.post(
+            "/bot/create-magic-link", json={"telegram_uid": telegram_uid}
+        )
+    except httpx.HTTPError:
+        return None
     if response.status_code != 200:
         return None
     payload = response.json()
@@ -169,37 +106,33 @@ def extract_token(link: str) -> str | None:
         return None
 
 
-MAGIC_LINK_MESSAGES: dict[str, dict] = {}
-MAGIC_LINK_LOCK = threading.Lock()
-
-
-def schedule_magic_link_expiry(token: str, expires_in: int) -> None:
-    def expire() -> None:
-        time.sleep(max(expires_in, 1))
-        expire_magic_link(token)
-
-    thread = threading.Thread(target=expire, daemon=True)
-    thread.start()
-
-
-def expire_magic_link(token: str) -> None:
-    with MAGIC_LINK_LOCK:
-        entry = MAGIC_LINK_MESSAGES.pop(token, None)
-    if not entry:
-        return
+async def edit_expired_link(token: str, entry: dict) -> None:
     try:
-        edit_message(
+        await outbound.send(
             entry["chat_id"],
-            entry["message_id"],
-            "Login link expired. Request /app again.",
-            parse_mode="HTML",
-            reply_markup={"inline_keyboard": []},
+            lambda: telegram.edit_message(
+                entry["chat_id"],
+                entry["message_id"],
+                "Login link expired. Request /app again.",
+                parse_mode="HTML",
+                reply_markup={"inline_keyboard": []},
+            ),
+            PRIORITY_LOGIN,
         )
     except HTTPException:
         return
 
 
-def process_message(message: dict) -> None:
+magic_link_expiry = ExpiryScheduler(MAGIC_LINK_FILE, edit_expired_link)
+
+
+async def expire_magic_link(token: str) -> None:
+    entry = magic_link_expiry.pop(token)
+    if entry:
+        await edit_expired_link(token, entry)
+
+
+async def process_message(message: dict) -> None:
     if not message:
         return
     text = message.get("text", "")
@@ -212,7 +145,7 @@ def process_message(message: dict) -> None:
     if text.strip().startswith("/app"):
         if GROUP_CHAT_ID and chat_id != str(GROUP_CHAT_ID):
             return
-        link_payload = create_magic_link(user_id)
+        link_payload = await create_magic_link(user_id)
         if link_payload:
             link, expires_in = link_payload
             username = user.get("username")
@@ -234,122 +167,249 @@ def process_message(message: dict) -> None:
             reply_markup = {
                 "inline_keyboard": [[{"text": "Open login link", "url": link}]]
             }
-            message_id = send_message(
-                chat_id, message_text, parse_mode="HTML", reply_markup=reply_markup
+            message_id = await outbound.send(
+                chat_id,
+                lambda: telegram.send_message(
+                    chat_id, message_text, parse_mode="HTML", reply_markup=reply_markup
+                ),
+                PRIORITY_LOGIN,
             )
             token = extract_token(link)
             if token and message_id:
-                with MAGIC_LINK_LOCK:
-                    MAGIC_LINK_MESSAGES[token] = {
-                        "chat_id": chat_id,
-                        "message_id": message_id,
-                    }
-                schedule_magic_link_expiry(token, expires_in)
+                magic_link_expiry.schedule(
+                    token, expires_in, chat_id=chat_id, message_id=message_id
+                )
         else:
-            send_message(chat_id, "Unable to create login link. Are you whitelisted?")
+            await outbound.send(
+                chat_id,
+                lambda: telegram.send_message(
+                    chat_id, "Unable to create login link. Are you whitelisted?"
+                ),
+                PRIORITY_LOGIN,
+            )
 
 
-def poll_loop() -> None:
-    if not BOT_TOKEN:
+update_offset: Optional[int] = None
+update_queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=WEBHOOK_QUEUE_SIZE)
+
+
+async def handle_update(update: dict) -> None:
+    global update_offset
+    update_id = update.get("update_id", 0)
+    # Telegram redelivers webhook updates it considers unacknowledged.
+    if update_offset is not None and update_id < update_offset:
         return
-    offset = load_offset()
+    update_offset = update_id + 1
+    try:
+        await process_message(update.get("message"))
+    except HTTPException:
+        pass
+    save_offset(update_offset)
+
+
+async def poll_loop() -> None:
     while True:
-        params = {"timeout": 30}
-        if offset is not None:
-            params["offset"] = offset
         try:
-            response = requests.get(
-                f"{TELEGRAM_API}/getUpdates", params=params, timeout=35
-            )
-            data = response.json()
-            if not data.get("ok"):
-                time.sleep(POLL_INTERVAL)
-                continue
-            for update in data.get("result", []):
-                offset = update.get("update_id", 0) + 1
-                process_message(update.get("message"))
-                save_offset(offset)
-        except requests.RequestException:
-            time.sleep(5)
+            updates = await telegram.get_updates(update_offset)
+        except HTTPException:
+            await asyncio.sleep(POLL_RETRY_SECONDS)
             continue
-        time.sleep(POLL_INTERVAL)
+        for update in updates:
+            await handle_update(update)
 
 
-@app.on_event("startup")
-def start_polling() -> None:
+async def webhook_worker() -> None:
+    while True:
+        update = await update_queue.get()
+        try:
+            await handle_update(update)
+        finally:
+            update_queue.task_done()
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    global update_offset
     if not BOT_TOKEN:
         raise RuntimeError("TELEGRAM_BOT_TOKEN is required")
-    thread = threading.Thread(target=poll_loop, daemon=True)
-    thread.start()
+    telegram.start()
+    outbound.start()
+    magic_link_expiry.start()
+    activity_outbox.start()
+    update_offset = load_offset()
+    if UPDATE_MODE == "webhook":
+        if not WEBHOOK_URL or not WEBHOOK_SECRET:
+            raise RuntimeError(
+                "TELEGRAM_WEBHOOK_URL and TELEGRAM_WEBHOOK_SECRET are required in webhook mode"
+            )
+        await telegram.set_webhook(WEBHOOK_URL, WEBHOOK_SECRET)
+        worker = asyncio.create_task(webhook_worker())
+    else:
+        try:
+            await telegram.delete_webhook()
+        except HTTPException:
+            pass
+        worker = asyncio.create_task(poll_loop())
+    yield
+    if UPDATE_MODE == "webhook":
+        try:
+            await asyncio.wait_for(update_queue.join(), timeout=WEBHOOK_DRAIN_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    worker.cancel()
+    try:
+        await worker
+    except asyncio.CancelledError:
+        pass
+    await activity_outbox.stop()
+    await magic_link_expiry.stop()
+    await outbound.stop()
+    await telegram.close()
+    await api_client.aclose()
+
+
+app = FastAPI(title="nut places bot", lifespan=lifespan)
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
+@app.post("/telegram/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+):
+    if UPDATE_MODE != "webhook":
+        raise HTTPException(status_code=404, detail="Webhook mode disabled")
+    if not x_telegram_bot_api_secret_token or not secrets.compare_digest(
+        x_telegram_bot_api_secret_token, WEBHOOK_SECRET
+    ):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        update = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid update")
+    try:
+        update_queue.put_nowait(update)
+    except asyncio.QueueFull:
+        # Telegram retries non-2xx responses, so the update is not lost.
+        raise HTTPException(status_code=503, detail="Busy")
+    return {"ok": True}
+
+
 @app.post("/send-otp")
-def send_otp(payload: OtpMessage):
+async def send_otp(payload: OtpMessage):
     if not payload.telegram_uid:
         raise HTTPException(status_code=400, detail="telegram_uid required")
-    send_message(payload.telegram_uid, f"Your OTP pin: {payload.pin}")
+    await outbound.send(
+        payload.telegram_uid,
+        lambda: telegram.send_message(
+            payload.telegram_uid, f"Your OTP pin: {payload.pin}"
+        ),
+        PRIORITY_LOGIN,
+    )
     return {"status": "sent"}
 
 
 @app.post("/send-magic-link")
-def send_magic_link(payload: MagicLinkMessage):
-    send_message(
+async def send_magic_link(payload: MagicLinkMessage):
+    await outbound.send(
         payload.telegram_uid,
-        "Tap the button below to log in.",
-        reply_markup={
-            "inline_keyboard": [
-                [{"text": "Open login link", "url": payload.magic_link}]
-            ]
-        },
+        lambda: telegram.send_message(
+            payload.telegram_uid,
+            "Tap the button below to log in.",
+            reply_markup={
+                "inline_keyboard": [
+                    [{"text": "Open login link", "url": payload.magic_link}]
+                ]
+            },
+        ),
+        PRIORITY_LOGIN,
     )
     return {"status": "sent"}
 
 
 @app.post("/magic-link/expire")
-def expire_magic_link_endpoint(
+async def expire_magic_link_endpoint(
     payload: MagicLinkExpire,
     x_bot_token: str | None = Header(default=None),
 ):
     if BOT_API_KEY and x_bot_token != BOT_API_KEY:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    expire_magic_link(payload.token)
+    await expire_magic_link(payload.token)
     return {"status": "ok"}
 
 
-@app.post("/send-activity")
-def send_activity(payload: ActivityMessage, x_bot_token: str | None = Header(default=None)):
-    if BOT_API_KEY and x_bot_token != BOT_API_KEY:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if not GROUP_CHAT_ID:
-        raise HTTPException(status_code=400, detail="GROUP_CHAT_ID not set")
-    if not payload.text:
-        raise HTTPException(status_code=400, detail="text required")
+async def deliver_activity(payload: ActivityMessage) -> None:
     if payload.image_url:
         try:
-            send_photo(
+            await outbound.send(
                 GROUP_CHAT_ID,
-                payload.text,
-                payload.image_url,
-                parse_mode=payload.parse_mode,
-                reply_markup=payload.reply_markup,
+                lambda: telegram.send_photo(
+                    GROUP_CHAT_ID,
+                    payload.text,
+                    payload.image_url,
+                    parse_mode=payload.parse_mode,
+                    reply_markup=payload.reply_markup,
+                ),
             )
+            return
+        except TelegramRetryAfter:
+            # Rate limited, not a bad photo: sending text instead would only add load.
+            raise
         except HTTPException:
-            send_message(
-                GROUP_CHAT_ID,
-                payload.text,
-                parse_mode=payload.parse_mode,
-                reply_markup=payload.reply_markup,
-            )
-    else:
-        send_message(
+            pass
+    await outbound.send(
+        GROUP_CHAT_ID,
+        lambda: telegram.send_message(
             GROUP_CHAT_ID,
             payload.text,
             parse_mode=payload.parse_mode,
             reply_markup=payload.reply_markup,
-        )
-    return {"status": "sent"}
+        ),
+    )
+
+
+async def deliver_outbox_item(data: dict) -> None:
+    await deliver_activity(ActivityMessage(**data))
+
+
+activity_outbox = ActivityOutbox(OUTBOX_DB, deliver_outbox_item)
+
+
+def queue_activity(payload: ActivityMessage, idempotency_key: str | None = None) -> bool:
+    key = idempotency_key or payload.idempotency_key or uuid4().hex
+    return activity_outbox.append(key, payload.model_dump(exclude={"idempotency_key"}))
+
+
+@app.post("/send-activity", status_code=202)
+async def send_activity(
+    payload: ActivityMessage,
+    x_bot_token: str | None = Header(default=None),
+    idempotency_key: str | None = Header(default=None),
+):
+    if BOT_API_KEY and x_bot_token != BOT_API_KEY:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not GROUP_CHAT_ID:
+        raise HTTPException(status_code=400, detail="GROUP_CHAT_ID not set")
+    if not payload.text:
+        raise HTTPException(status_code=400, detail="text required")
+    queued = queue_activity(payload, idempotency_key)
+    return {"status": "queued" if queued else "duplicate"}
+
+
+@app.post("/send-activity-batch", status_code=202)
+async def send_activity_batch(
+    payload: ActivityBatch, x_bot_token: str | None = Header(default=None)
+):
+    if BOT_API_KEY and x_bot_token != BOT_API_KEY:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not GROUP_CHAT_ID:
+        raise HTTPException(status_code=400, detail="GROUP_CHAT_ID not set")
+    queued = 0
+    for item in payload.items:
+        if item.text and queue_activity(item):
+            queued += 1
+    return {"status": "queued", "queued": queued}
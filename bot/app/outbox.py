@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from typing import Awaitable, Callable, Optional
+
+OUTBOX_DB = os.getenv("OUTBOX_DB", "/data/outbox.db")
+OUTBOX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "2"))
+OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "300"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+# Delivered rows are kept this long so late retries from the API still dedupe.
+OUTBOX_RETENTION_SECONDS = int(os.getenv("OUTBOX_RETENTION_SECONDS", str(7 * 24 * 3600)))
+OUTBOX_PURGE_INTERVAL_SECONDS = float(os.getenv("OUTBOX_PURGE_INTERVAL_SECONDS", "3600"))
+
+
+class ActivityOutbox:
+    """Persistent FIFO of activity broadcasts, delivered by a single worker."""
+
+    def __init__(self, path: str, deliver: Callable[[dict], Awaitable[None]]) -> None:
+        self.path = path
+        self.deliver = deliver
+        self.conn: Optional[sqlite3.Connection] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.purged_at = 0.0
+
+    def open(self) -> None:
+        if self.conn is not None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                idempotency_key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                delivered_at REAL
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_outbox_status_id ON outbox (status, id)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_outbox_status_created_at "
+            "ON outbox (status, created_at)"
+        )
+
+    def append(self, idempotency_key: str, payload: dict) -> bool:
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO outbox "
+            "(idempotency_key, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+            (idempotency_key, json.dumps(payload), now, now),
+        )
+        self.wakeup.set()
+        return cursor.rowcount == 1
+
+    def start(self) -> None:
+        self.open()
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    async def wait(self, timeout: float | None) -> None:
+        self.wakeup.clear()
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def purge(self, now: float) -> None:
+        self.conn.execute(
+            "DELETE FROM outbox WHERE status IN ('delivered', 'failed') AND created_at < ?",
+            (now - OUTBOX_RETENTION_SECONDS,),
+        )
+        self.purged_at = now
+
+    async def run(self) -> None:
+        while True:
+            now = time.time()
+            if now - self.purged_at >= OUTBOX_PURGE_INTERVAL_SECONDS:
+                self.purge(now)
+            row = self.conn.execute(
+                "SELECT id, payload, attempts, next_attempt_at FROM outbox "
+                "WHERE status = 'pending' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                await self.wait(OUTBOX_PURGE_INTERVAL_SECONDS)
+                continue
+            row_id, payload, attempts, next_attempt_at = row
+            # Strict FIFO: a message waiting on backoff holds back the ones behind it.
+            if next_attempt_at > now:
+                await self.wait(next_attempt_at - now)
+                continue
+            try:
+                await self.deliver(json.loads(payload))
+            except Exception as exc:
+                attempts += 1
+                if attempts >= OUTBOX_MAX_ATTEMPTS:
+                    self.conn.execute(
+                        "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? "
+                        "WHERE id = ?",
+                        (attempts, str(exc), row_id),
+                    )
+                else:
+                    delay = min(
+                        OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                        OUTBOX_MAX_BACKOFF_SECONDS,
+                    )
+                    self.conn.execute(
+                        "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? "
+                        "WHERE id = ?",
+                        (attempts, time.time() + delay, str(exc), row_id),
+                    )
+                continue
+            self.conn.execute(
+                "UPDATE outbox SET status = 'delivered', attempts = ?, delivered_at = ? "
+                "WHERE id = ?",
+                (attempts + 1, time.time(), row_id),
+            )
@@ -0,0 +1,96 @@
+import asyncio
+import heapq
+import json
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+
+class ExpiryScheduler:
+    """Runs magic-link expiries from a single task ordered by a min-heap.
+
+    Pending entries are written to ``path`` on every change and reloaded on
+    startup, so expiries survive a restart. Overdue entries fire immediately.
+    """
+
+    def __init__(self, path: str, on_expire: Callable[[str, dict], Awaitable[None]]) -> None:
+        self.path = path
+        self.on_expire = on_expire
+        self.entries: dict[str, dict] = {}
+        self.heap: list[tuple[float, str]] = []
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                entries = json.load(handle)
+        except Exception:
+            return
+        for token, entry in entries.items():
+            self.entries[token] = entry
+            heapq.heappush(self.heap, (entry["expires_at"], token))
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.entries, handle)
+        os.replace(tmp_path, self.path)
+
+    def schedule(self, token: str, expires_in: int, **data) -> None:
+        expires_at = time.time() + max(expires_in, 1)
+        self.entries[token] = {**data, "expires_at": expires_at}
+        heapq.heappush(self.heap, (expires_at, token))
+        self.save()
+        self.wakeup.set()
+
+    def pop(self, token: str) -> Optional[dict]:
+        # The heap entry is left behind and skipped when it comes due.
+        entry = self.entries.pop(token, None)
+        if entry is not None:
+            self.save()
+        return entry
+
+    def start(self) -> None:
+        if self.task is None:
+            self.load()
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            while self.heap and self.heap[0][1] not in self.entries:
+                heapq.heappop(self.heap)
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            expires_at, token = self.heap[0]
+            delay = expires_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self.heap)
+            entry = self.entries.get(token)
+            # A re-scheduled token leaves an older heap entry behind.
+            if entry is None or entry["expires_at"] != expires_at:
+                continue
+            self.pop(token)
+            try:
+                await self.on_expire(token, entry)
+            except Exception:
+                pass
@@ -0,0 +1,183 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from .telegram import TelegramRetryAfter
+
+# Telegram allows ~30 messages/s overall, 1/s per private chat and 20/min per group.
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_PRIVATE_CHAT_RATE = float(os.getenv("TELEGRAM_PRIVATE_CHAT_RATE", "1"))
+TELEGRAM_GROUP_CHAT_PER_MINUTE = float(os.getenv("TELEGRAM_GROUP_CHAT_PER_MINUTE", "20"))
+TELEGRAM_GROUP_CHAT_BURST = float(os.getenv("TELEGRAM_GROUP_CHAT_BURST", "3"))
+TELEGRAM_SEND_ATTEMPTS = int(os.getenv("TELEGRAM_SEND_ATTEMPTS", "3"))
+
+PRIORITY_LOGIN = 0
+PRIORITY_ACTIVITY = 10
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self.refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class SendScheduler:
+    """Rate-limited dispatcher for Telegram calls.
+
+    Jobs are picked in priority order, skipping chats whose bucket is still
+    empty or that already have a call in flight, and each call runs as its own
+    task. A throttled group broadcast or a slow photo upload therefore never
+    holds up a login message, while messages to one chat stay in order.
+    """
+
+    def __init__(self) -> None:
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self.chat_buckets: dict[str, TokenBucket] = {}
+        self.jobs: list[tuple[int, int, dict]] = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.in_flight: set[asyncio.Task] = set()
+        self.busy_chats: set[str] = set()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        for task in list(self.in_flight):
+            task.cancel()
+        await asyncio.gather(*self.in_flight, return_exceptions=True)
+
+    def chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if str(chat_id).startswith("-"):
+                bucket = TokenBucket(
+                    TELEGRAM_GROUP_CHAT_PER_MINUTE / 60, TELEGRAM_GROUP_CHAT_BURST
+                )
+            else:
+                bucket = TokenBucket(TELEGRAM_PRIVATE_CHAT_RATE, 1)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def send(
+        self,
+        chat_id: str,
+        call: Callable[[], Awaitable],
+        priority: int = PRIORITY_ACTIVITY,
+    ):
+        if self.task is None:
+            return await call()
+        future = asyncio.get_running_loop().create_future()
+        job = {"chat_id": str(chat_id), "call": call, "future": future, "attempts": 0}
+        heapq.heappush(self.jobs, (priority, next(self.counter), job))
+        self.wakeup.set()
+        return await future
+
+    def next_ready(self, now: float) -> tuple[Optional[tuple], Optional[float]]:
+        """The first job that can go now, or None and how long until one can.
+
+        The wait is None when every queued job's chat has a call in flight;
+        only that call finishing (which sets ``wakeup``) can free one up.
+        """
+        wait = None
+        for item in sorted(self.jobs):
+            if item[2]["chat_id"] in self.busy_chats:
+                continue
+            chat_wait = self.chat_bucket(item[2]["chat_id"]).wait_time(now)
+            if chat_wait == 0:
+                return item, 0.0
+            wait = chat_wait if wait is None else min(wait, chat_wait)
+        return None, wait
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+            if not self.jobs:
+                await self.wakeup.wait()
+                continue
+            now = time.monotonic()
+            global_wait = self.global_bucket.wait_time(now)
+            item, chat_wait = (None, global_wait) if global_wait else self.next_ready(now)
+            if item is None:
+                try:
+                    await asyncio.wait_for(
+                        self.wakeup.wait(),
+                        timeout=None if chat_wait is None else max(chat_wait, 0.01),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.jobs.remove(item)
+            heapq.heapify(self.jobs)
+            priority, _, job = item
+            bucket = self.chat_bucket(job["chat_id"])
+            self.global_bucket.take()
+            bucket.take()
+            job["attempts"] += 1
+            self.busy_chats.add(job["chat_id"])
+            task = asyncio.create_task(self.dispatch(priority, job, bucket))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+
+    async def dispatch(self, priority: int, job: dict, bucket: TokenBucket) -> None:
+        try:
+            result = await job["call"]()
+        except TelegramRetryAfter as exc:
+            now = time.monotonic()
+            # A 429 doesn't say which limit was hit; another chat still paused
+            # by one means the bot-wide limit, so hold every chat back.
+            if any(
+                other is not bucket and other.paused_until > now
+                for other in self.chat_buckets.values()
+            ):
+                self.global_bucket.pause(exc.retry_after)
+            bucket.pause(exc.retry_after)
+            if job["attempts"] < TELEGRAM_SEND_ATTEMPTS:
+                heapq.heappush(self.jobs, (priority, next(self.counter), job))
+            elif not job["future"].done():
+                job["future"].set_exception(exc)
+        except asyncio.CancelledError:
+            job["future"].cancel()
+            raise
+        except Exception as exc:
+            if not job["future"].done():
+                job["future"].set_exception(exc)
+        else:
+            if not job["future"].done():
+                job["future"].set_result(result)
+        finally:
+            self.busy_chats.discard(job["chat_id"])
+            self.wakeup.set()
@@ -0,0 +1,139 @@
+import os
+
+import httpx
+from fastapi import HTTPException
+
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "https://api.telegram.org")
+TELEGRAM_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_MAX_CONNECTIONS", "10"))
+TELEGRAM_TIMEOUT_SECONDS = float(os.getenv("TELEGRAM_TIMEOUT_SECONDS", "10"))
+
+
+class TelegramRetryAfter(HTTPException):
+    """Telegram answered 429; ``retry_after`` is the wait it asked for in seconds."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(status_code=429, detail="Telegram rate limit hit")
+        self.retry_after = retry_after
+
+
+class TelegramClient:
+    """Bot API client over one keep-alive connection pool.
+
+    The base URL is configurable so the bot can be pointed at a local fake
+    Telegram server.
+    """
+
+    def __init__(self, token: str, base_url: str = TELEGRAM_API_BASE_URL) -> None:
+        self.base_url = f"{base_url.rstrip('/')}/bot{token}"
+        self.http: httpx.AsyncClient | None = None
+
+    def start(self) -> None:
+        if self.http is None:
+            self.http = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=TELEGRAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=TELEGRAM_MAX_CONNECTIONS,
+                ),
+                timeout=TELEGRAM_TIMEOUT_SECONDS,
+            )
+
+    async def close(self) -> None:
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def call(
+        self,
+        method: str,
+        payload: dict,
+        error_detail: str,
+        timeout: float | None = None,
+    ):
+        self.start()
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        try:
+            response = await self.http.post(f"/{method}", json=payload, **kwargs)
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail=error_detail)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code == 429:
+            parameters = data.get("parameters", {}) if isinstance(data, dict) else {}
+            raise TelegramRetryAfter(float(parameters.get("retry_after", 1)))
+        if response.status_code >= 400:
+            raise HTTPException(status_code=502, detail=error_detail)
+        if isinstance(data, dict) and not data.get("ok", False):
+            description = data.get("description", error_detail)
+            raise HTTPException(status_code=502, detail=description)
+        return data.get("result") if isinstance(data, dict) else None
+
+    async def send_message(
+        self,
+        chat_id: str,
+        text: str,
+        parse_mode: str | None = None,
+        reply_markup: dict | None = None,
+    ) -> int | None:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        result = await self.call(
+            "sendMessage", payload, "Failed to send Telegram message"
+        )
+        if isinstance(result, dict):
+            return result.get("message_id")
+        return None
+
+    async def send_photo(
+        self,
+        chat_id: str,
+        text: str,
+        image_url: str,
+        parse_mode: str | None = None,
+        reply_markup: dict | None = None,
+    ) -> None:
+        payload = {"chat_id": chat_id, "photo": image_url, "caption": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        if reply_markup:
+            payload["reply_markup"] = reply_markup
+        await self.call("sendPhoto", payload, "Failed to send Telegram photo")
+
+    async def edit_message(
+        self,
+        chat_id: str,
+        message_id: int,
+        text: str,
+        parse_mode: str | None = None,
+        reply_markup: dict | None = None,
+    ) -> None:
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        if reply_markup is not None:
+            payload["reply_markup"] = reply_markup
+        await self.call("editMessageText", payload, "Failed to edit Telegram message")
+
+    async def get_updates(self, offset: int | None, timeout: int = 30) -> list[dict]:
+        payload = {"timeout": timeout}
+        if offset is not None:
+            payload["offset"] = offset
+        result = await self.call(
+            "getUpdates", payload, "Failed to fetch Telegram updates", timeout=timeout + 5
+        )
+        return result if isinstance(result, list) else []
+
+    async def set_webhook(self, url: str, secret_token: str) -> None:
+        await self.call(
+            "setWebhook",
+            {"url": url, "secret_token": secret_token, "allowed_updates": ["message"]},
+            "Failed to set Telegram webhook",
+        )
+
+    async def delete_webhook(self) -> None:
+        await self.call("deleteWebhook", {}, "Failed to delete Telegram webhook")